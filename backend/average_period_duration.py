@@ -1,32 +1,38 @@
 import utils.preprocess_solves as pf
-from datetime import datetime
+import utils.timezones as tzs
 
-def average_time_per_day(sessions):
-    cubing_periods = pf.load_all_cubing_periods(sessions)
-    total_duration = 0  # in minutes
-    min_date = None
-    max_date = None
+def new_state():
+    return {"total_duration": 0, "min_date": None, "max_date": None}  # duration in minutes
 
+def accumulate(state, cubing_periods):
+    """Fold more cubing periods into the running total and date span."""
     for period in cubing_periods:
-        if not period.solves:
+        if not len(period):
             continue
 
-        total_duration += period.time_spent()
+        state["total_duration"] += period.time_spent()
 
-        first_solve_date = datetime.strptime(period.solves[0].date, '%Y-%m-%d %H:%M:%S')
-        last_solve_date = datetime.strptime(period.solves[-1].date, '%Y-%m-%d %H:%M:%S')
+        first_solve_date = int(period.local_timestamps[0])
+        last_solve_date = int(period.local_timestamps[-1])
 
-        if min_date is None or first_solve_date < min_date:
-            min_date = first_solve_date
-        if max_date is None or last_solve_date > max_date:
-            max_date = last_solve_date
+        if state["min_date"] is None or first_solve_date < state["min_date"]:
+            state["min_date"] = first_solve_date
+        if state["max_date"] is None or last_solve_date > state["max_date"]:
+            state["max_date"] = last_solve_date
 
+def finalize(state):
+    total_duration, min_date, max_date = state["total_duration"], state["min_date"], state["max_date"]
     if min_date is None or max_date is None or min_date == max_date:
         return 0  # Avoid division by zero
 
-    days_between = (max_date - min_date).days + 1  # inclusive of both ends
+    days_between = (max_date - min_date) // tzs.DAY_MS + 1  # inclusive of both ends
     return total_duration / days_between
 
+def average_time_per_day(sessions):
+    state = new_state()
+    accumulate(state, pf.load_all_cubing_periods(sessions))
+    return finalize(state)
+
 
 if __name__ == "__main__":
     sessions = pf.load_all_sessions("data/real.txt")  # use actual path
@@ -0,0 +1,68 @@
+import numpy as np
+import utils.preprocess_solves as pf
+import utils.rolling_average as ra
+import utils.timezones as tzs
+from utils.range_min import SparseTable
+
+# Single and average lengths that can be queried; each keeps an O(len log len)
+# index per session, so n is limited to the ones the dashboard shows
+SUPPORTED_NS = (1, 3, 5, 12, 100)
+
+def range_index(session, n):
+    """SparseTable over the singles (n == 1) or the aoN ending at each solve of a session.
+
+    Entry i of an aoN index is the average of rows [i, i + n). Built on the first
+    query and kept with the session.
+    """
+    key = ("best_in_range", n)
+    if key not in session.derived:
+        if n == 1:
+            series = session.times
+        else:
+            series = ra.batch_averages(ra.effective_ms(session.times_ms, session.penalties), n)
+        session.derived[key] = SparseTable(series)
+    return session.derived[key]
+
+def timestamps_sorted(session):
+    """Whether a session's timestamps are in solve order."""
+    key = ("best_in_range", "sorted")
+    if key not in session.derived:
+        session.derived[key] = bool(np.all(np.diff(session.timestamps) >= 0))
+    return session.derived[key]
+
+def best_in_range(session, n, t0, t1):
+    """Best single (n == 1) or aoN whose solves all fall between two epoch-ms instants (inclusive).
+
+    Returns:
+        dict or None: value in seconds, timestamp (epoch ms) and local date of the
+        solve that completed it, or None if no finished single/average is in range.
+    """
+    if n not in SUPPORTED_NS:
+        raise ValueError(f"n must be one of: {', '.join(map(str, SUPPORTED_NS))}")
+    timestamps = session.timestamps
+    index = range_index(session, n)
+    if timestamps_sorted(session):
+        lo = int(np.searchsorted(timestamps, t0, side='left'))
+        hi = int(np.searchsorted(timestamps, t1, side='right'))
+        best = index.argmin(lo, hi - n + 1)
+    else:
+        # Clock changes can put solves out of time order, so the solves in range need
+        # not be contiguous: keep the windows whose n solves are all inside it
+        inside = (timestamps >= t0) & (timestamps <= t1)
+        covered = np.concatenate(([0], np.cumsum(inside)))
+        starts = np.flatnonzero(covered[n:] - covered[:-n] == n)
+        best = int(starts[np.argmin(index.values[starts])]) if len(starts) else None
+    if best is None or not np.isfinite(index.values[best]):
+        return None
+    row = best + n - 1  # the solve that completed the average
+    return {
+        "value": float(index.values[best]),
+        "timestamp": int(timestamps[row]),
+        "date": tzs.format_local(session.local_timestamps[row]),
+    }
+
+if __name__ == "__main__":
+    session = pf.load_all_sessions("data/suku.txt")[0]
+    t0, t1 = int(session.timestamps[0]), int(session.timestamps[-1])
+    for n in (1, 5, 12, 100):
+        print(n, best_in_range(session, n, t0, t1))
@@ -1,17 +1,13 @@
 import utils.preprocess_solves as pf
-import statistics
+import numpy as np
 
 def consistency(sessions):
     std_dict = {}
     for session in sessions:
-        solve_times = []
-        for solve in session.solves:
-            if(solve.time == float('inf') or solve.time == 0):
-                continue
-            solve_times.append(solve.time)
-            #print(solve_times)
+        times = session.times
+        solve_times = times[np.isfinite(times) & (times != 0)]
         if len(solve_times) > 100:
-            std_dict[session.name] = statistics.stdev(solve_times)
+            std_dict[session.name] = float(np.std(solve_times, ddof=1))
     std_dict = dict(sorted(std_dict.items(), key=lambda item: item[1], reverse=False))
     return std_dict
 
@@ -0,0 +1,309 @@
+import copy
+import json
+import threading
+import numpy as np
+import utils.preprocess_solves as pf
+import monthly_breakdown
+import longest_cubing_period
+import max_time_spent_cubing_in_a_day
+import most_solves_in_a_day
+import pb_checker
+import pbs_per_day
+import total_time_spent_solving
+import average_period_duration
+import most_active_time_of_day
+import consistency
+
+# Stats folded over cubing periods, each with new_state/accumulate/finalize
+PERIOD_STATS = (
+    longest_cubing_period,
+    max_time_spent_cubing_in_a_day,
+    most_solves_in_a_day,
+    average_period_duration,
+    most_active_time_of_day,
+    monthly_breakdown,
+)
+
+# Groups of global stats computed together, each by the GlobalStats method named
+# after it, mapped to the keys of as_dict() it produces
+STAT_GROUPS = {
+    "longest_cubing_period": ("longest_cubing_period_stats",),
+    "max_time_spent_cubing_in_a_day": ("max_time_spent_cubing_in_a_day_stats",),
+    "most_solves_in_a_day": ("most_solves_in_a_day_stats",),
+    "pbs_per_day": ("most_pbs_in_a_day_stats", "pb_stats"),
+    "pbs_per_month": ("pbs_per_month_stats",),
+    "pbs_per_event": ("pbs_per_event_stats",),
+    "total_time_spent_solving": ("total_solves_stats", "event_times_stats"),
+    "average_period_duration": ("average_period_duration_stats",),
+    "most_active_time_of_day": ("days_dict_stats", "hours_dict_stats"),
+    "consistency": ("consistency_stats",),
+    "session_names": ("session_names",),
+    "monthly_breakdown": ("monthly_breakdown_stats",),
+}
+STAT_KEY_GROUPS = {key: group for group, keys in STAT_GROUPS.items() for key in keys}
+
+class GlobalStats:
+    """Running global stats of an upload.
+
+    Every session remembers how many solves have been scanned, its last cubing
+    period (which appended solves may still extend, so it is kept out of the
+    running states) and its current PBs, so a later export that only appends
+    solves is folded in by scanning the new tail alone.
+    """
+
+    def __init__(self, sessions, on_progress=None):
+        self.sessions = []
+        self.timezone_str = sessions[0].table.timezone_str if sessions else 'UTC'
+        self.period_states = {module: module.new_state() for module in PERIOD_STATS}
+        self.pb_events = []  # pb_checker event arrays, one per scanned tail
+        self.progress = []
+        self._scan(sessions, on_progress)
+
+    def __str__(self):
+        return f"GlobalStats: {len(self.sessions)} sessions, {sum(p['scanned'] for p in self.progress)} solves"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def nbytes(self):
+        """Bytes of the PB event arrays, which grow with the solves; the period states are small."""
+        return sum(events.nbytes for events in self.pb_events)
+
+    def _scan(self, sessions, on_progress=None):
+        """Fold in the solves of every session past its scanned prefix.
+
+        Periods and PBs are scanned in two passes; on_progress(stage, done, total)
+        is called with stage "periods" or "pbs" after each session with new solves.
+        """
+        for index in range(len(self.progress), len(sessions)):
+            self.progress.append({"scanned": 0, "open_period": None, "pbs": [float('inf')] * len(pbs_per_day.COUNTED_TYPES)})
+        tails = [index for index, session in enumerate(sessions) if self.progress[index]["scanned"] != len(session)]
+
+        for done, index in enumerate(tails, 1):
+            progress = self.progress[index]
+            open_period = progress["open_period"]
+            periods = pf.get_cubing_periods(sessions[index], open_period.start if open_period else 0)
+            progress["open_period"] = periods[-1]
+            for module in PERIOD_STATS:
+                module.accumulate(self.period_states[module], periods[:-1])
+            if on_progress:
+                on_progress("periods", done, len(tails))
+
+        for done, index in enumerate(tails, 1):
+            progress = self.progress[index]
+            events, progress["pbs"] = pb_checker.session_pb_events(
+                sessions[index], index, pbs_per_day.COUNTED_TYPES, progress["scanned"], progress["pbs"]
+            )
+            self.pb_events.append(events)
+            progress["scanned"] = len(sessions[index])
+            if on_progress:
+                on_progress("pbs", done, len(tails))
+        if on_progress and not tails:
+            on_progress("periods", 0, 0)
+            on_progress("pbs", 0, 0)
+        self.sessions = sessions
+
+    def _is_prefix_of(self, sessions):
+        """True if every known session is unchanged in `sessions` apart from appended solves."""
+        if len(sessions) < len(self.sessions) or not sessions:
+            return False
+        if sessions[0].table.timezone_str != self.timezone_str:
+            return False
+        for old, new in zip(self.sessions, sessions):
+            if (old.id, old.name, old.scramble_event) != (new.id, new.name, new.scramble_event):
+                return False
+            n = len(old)
+            if len(new) < n:
+                return False
+            for column in ("timestamps", "times_ms", "penalties"):
+                if not np.array_equal(getattr(old, column), getattr(new, column)[:n]):
+                    return False
+        return True
+
+    def extend(self, sessions, on_progress=None):
+        """Fold a newer export of the same sessions into the stats.
+
+        on_progress is passed on to the scan of the new solves, as in the constructor.
+
+        Returns:
+            bool: False (leaving the stats untouched) if `sessions` is not the
+            known sessions plus appended solves and/or new sessions.
+        """
+        if not self._is_prefix_of(sessions):
+            return False
+
+        # Point kept periods at the new session views so the old table can be freed
+        def rebind(period):
+            session = sessions[self.sessions.index(period.session)]
+            return pf.CubingPeriod(session, period.start, period.stop)
+
+        longest = self.period_states[longest_cubing_period]
+        if longest["longest_period"] is not None:
+            longest["longest_period"] = rebind(longest["longest_period"])
+        for progress in self.progress:
+            if progress["open_period"] is not None:
+                progress["open_period"] = rebind(progress["open_period"])
+
+        self._scan(sessions, on_progress)
+        return True
+
+    def copy(self):
+        """An independent copy that shares the read-only sessions, so it can be extended
+        while this one is still in use."""
+        shared = {id(module): module for module in PERIOD_STATS}
+        shared.update({id(session): session for session in self.sessions})
+        return copy.deepcopy(self, shared)
+
+    def _current_state(self, module):
+        """A copy of one period stat's state with every session's last period folded in."""
+        shared = {id(session): session for session in self.sessions}
+        state = copy.deepcopy(self.period_states[module], shared)
+        module.accumulate(state, [progress["open_period"] for progress in self.progress if progress["open_period"] is not None])
+        return state
+
+    def _longest_cubing_period(self):
+        longest_period, max_duration_hours = longest_cubing_period.finalize(self._current_state(longest_cubing_period))
+        return {
+            "longest_cubing_period_stats": (
+                f"Longest time spent cubing at a stretch: {longest_period.session_name} with {len(longest_period)} solves\n"
+                f"Duration: {max_duration_hours:.2f} hours\n"
+                f"Scramble Event: {longest_period.scramble_event}\n"
+                f"Start Date: {longest_period.start_date}\n"
+                f"End Date: {longest_period.end_date}"
+            ),
+        }
+
+    def _max_time_spent_cubing_in_a_day(self):
+        max_date, max_time_hours = max_time_spent_cubing_in_a_day.finalize(self._current_state(max_time_spent_cubing_in_a_day))
+        return {"max_time_spent_cubing_in_a_day_stats": f"{max_time_hours:.2f} hours on {max_date}"}
+
+    def _most_solves_in_a_day(self):
+        max_solves_date, max_solves = most_solves_in_a_day.finalize(self._current_state(most_solves_in_a_day))
+        return {"most_solves_in_a_day_stats": f"Day with the most solves: {max_solves_date} with {max_solves} solves"}
+
+    def _pbs_per_day(self):
+        date, counts = pbs_per_day.most_pbs(np.concatenate(self.pb_events))
+        return {
+            "most_pbs_in_a_day_stats": f"Date with most PBs: {date}, Counts: {counts[date]}",
+            "pb_stats": counts,
+        }
+
+    def _pbs_per_month(self):
+        return {"pbs_per_month_stats": pbs_per_day.pbs_per_month(np.concatenate(self.pb_events))}
+
+    def _pbs_per_event(self):
+        # Event ids are stable across extend(): a renamed or removed session is not a prefix
+        event_names = self.sessions[0].table.events if self.sessions else []
+        return {"pbs_per_event_stats": pbs_per_day.pbs_per_event(np.concatenate(self.pb_events), event_names)}
+
+    def _total_time_spent_solving(self):
+        total_solves, event_times = total_time_spent_solving.time_spent_breakup(self.sessions)
+        return {"total_solves_stats": total_solves, "event_times_stats": event_times}
+
+    def _average_period_duration(self):
+        average_period_duration_stats = average_period_duration.finalize(self._current_state(average_period_duration))
+        return {"average_period_duration_stats": f"Average time spent per day: {average_period_duration_stats:.2f} minutes"}
+
+    def _most_active_time_of_day(self):
+        days_dict, hours_dict = most_active_time_of_day.finalize(self._current_state(most_active_time_of_day))
+        return {"days_dict_stats": days_dict, "hours_dict_stats": hours_dict}
+
+    def _consistency(self):
+        return {"consistency_stats": consistency.consistency(self.sessions)}
+
+    def _session_names(self):
+        return {"session_names": [session.name for session in self.sessions]}
+
+    def _monthly_breakdown(self):
+        return {"monthly_breakdown_stats": monthly_breakdown.finalize(self._current_state(monthly_breakdown))}
+
+    def build(self, group):
+        """The keys of as_dict() that one of STAT_GROUPS produces."""
+        if group not in STAT_GROUPS:
+            raise KeyError(f"Unknown stat group: {group}")
+        return getattr(self, "_" + group)()
+
+    def as_dict(self):
+        """The global stats as returned by /upload-solves/."""
+        stats = {}
+        for group in STAT_GROUPS:
+            stats.update(self.build(group))
+        return stats
+
+class StatsCache:
+    """The global stats of one dataset, computed group by group on first request and memoized.
+
+    The sessions are only scanned once a stat needs it. `base` is the GlobalStats
+    of the client's previous upload: a copy of it is extended from the appended
+    solves if this upload only adds to it.
+    """
+
+    def __init__(self, sessions, base=None):
+        self.sessions = sessions
+        self._base = base
+        self._stats = None
+        self._results = {}
+        self._results_nbytes = 0
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f"StatsCache: {len(self._results)} of {len(STAT_KEY_GROUPS)} stats computed"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def nbytes(self):
+        """Bytes of the scan plus the computed stats, the latter measured as JSON."""
+        return (self._stats.nbytes if self._stats is not None else 0) + self._results_nbytes
+
+    @property
+    def scanned(self):
+        """The GlobalStats, or None if no stat has needed the scan yet."""
+        return self._stats
+
+    def _scan(self, on_progress):
+        if self._stats is None:
+            stats = self._base.copy() if self._base is not None else None
+            if stats is None or not stats.extend(self.sessions, on_progress):
+                stats = GlobalStats(self.sessions, on_progress)
+            self._stats, self._base = stats, None
+        return self._stats
+
+    def scan(self, on_progress=None):
+        """Scan the sessions unless already done, passing on_progress to GlobalStats."""
+        with self._lock:
+            return self._scan(on_progress)
+
+    def get(self, keys=None, on_progress=None):
+        """The requested keys of GlobalStats.as_dict() (all of them if None), computing
+        the groups that produce them on first use.
+
+        Raises:
+            KeyError: If a key is not a global stat.
+        """
+        keys = list(STAT_KEY_GROUPS) if keys is None else keys
+        groups = []
+        for key in keys:
+            if key not in STAT_KEY_GROUPS:
+                raise KeyError(f"Unknown stat: {key}")
+            if STAT_KEY_GROUPS[key] not in groups:
+                groups.append(STAT_KEY_GROUPS[key])
+        with self._lock:
+            for group in groups:
+                if STAT_GROUPS[group][0] in self._results:
+                    continue
+                if group == "session_names":  # needs no scan, and is all an upload returns
+                    built = {"session_names": [session.name for session in self.sessions]}
+                else:
+                    built = self._scan(on_progress).build(group)
+                self._results.update(built)
+                self._results_nbytes += len(json.dumps(built, default=str))
+            return {key: self._results[key] for key in keys}
+
+if __name__ == "__main__":
+    sessions = pf.load_all_sessions("data/suku.txt")
+    stats = GlobalStats(sessions)
+    print(stats)
+    print(stats.as_dict()["longest_cubing_period_stats"])
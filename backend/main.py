@@ -1,23 +1,29 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Literal, Optional, Union
+import asyncio
+import json
 import shutil
 import os
+import tempfile
 
 # Import all custom analysis modules
 import utils.preprocess_solves as pf
-import monthly_breakdown
-import time_spent_cubing
-import longest_cubing_period
-import max_time_spent_cubing_in_a_day
-import most_solves_in_a_day
-import pbs_per_day
-import total_time_spent_solving
+import utils.upload_cache as upload_cache
+from utils.dataset_store import Dataset, DatasetStore
+from utils.analysis_pool import AnalysisPool, PoolBusy
+from utils.upload_jobs import UploadJob, JobStore
+from utils.result_cache import ResultCache, make_etag, etag_matches
+import utils.wire_format as wire
+from utils.downsample import downsample, METHODS as DOWNSAMPLE_METHODS
+from global_stats import StatsCache, STAT_GROUPS, STAT_KEY_GROUPS
 import plot_improvement
+import best_in_range
+import session_series
 import solve_level
-import average_period_duration
-import most_active_time_of_day
-import consistency
 from time_distribution import time_distribution
 
 # Initialize FastAPI app
@@ -32,92 +38,241 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global state
-loaded_sessions = []
-global_stats_cache = {}
+# Compress responses for clients that accept gzip (server-sent events are left alone)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Number of processes used to parse an uploaded export (1 parses it in the request itself)
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", "1"))
+
+# Uploaded datasets, looked up by the dataset_id returned from /upload-solves/
+datasets = DatasetStore(
+    max_datasets=int(os.environ.get("DATASET_STORE_MAX", "16")),
+    max_bytes=int(os.environ.get("DATASET_STORE_MAX_BYTES", str(1024 * 1024 * 1024))),
+)
+
+# Parsing and analysis run on this pool so the event loop stays free for other requests;
+# once ANALYSIS_MAX_PENDING jobs are running or waiting, new ones get a 503
+analysis_pool = AnalysisPool(
+    workers=int(os.environ.get("ANALYSIS_WORKERS", "2")),
+    max_pending=int(os.environ.get("ANALYSIS_MAX_PENDING", "8")),
+)
+ANALYSIS_RETRY_AFTER = int(os.environ.get("ANALYSIS_RETRY_AFTER", "5"))  # seconds
+
+# Uploads analysed in the background, looked up by the job_id returned from /upload-jobs/
+jobs = JobStore(max_jobs=int(os.environ.get("UPLOAD_JOBS_MAX", "64")))
+JOB_EVENTS_INTERVAL = 0.25  # seconds between progress checks of a job's event stream
+BATCH_RETRY_INTERVAL = 0.1  # seconds a batch waits for room on a full analysis pool
+
+# Stages of a background upload; session names are published with "parse" so the
+# session picker can be shown before any global stat is ready
+UPLOAD_STAGES = ("parse", "periods", "pbs") + tuple(group for group in STAT_GROUPS if group != "session_names")
+
+# Encoded stat responses keyed by ETag, which is derived from the upload's content
+# hash and the request, so revisiting a session (even after re-uploading the same
+# file) is answered without recomputing; bump RESULT_VERSION when outputs change
+results = ResultCache(max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+RESULT_VERSION = 2
 
 # Pydantic model for session-specific requests
 class SessionIndexRequest(BaseModel):
+    dataset_id: str
     session_index: int
+    # Downsample each chart series to at most this many points ("lttb" or "minmax")
+    max_points: Optional[int] = None
+    downsample: str = "lttb"
 
-@app.post("/upload-solves/")
-async def upload_solves(
-    file: UploadFile = File(...),
-    timezone: str = Form(...)
-):
-    global loaded_sessions, global_stats_cache
+# Best single (n = 1) or aoN (n in best_in_range.SUPPORTED_NS) with every solve
+# between t0 and t1 (UTC epoch ms, inclusive)
+class BestInRangeRequest(BaseModel):
+    dataset_id: str
+    session_index: int
+    n: int = 1
+    t0: int
+    t1: int
 
-    if not timezone:
-        raise HTTPException(status_code=400, detail="Timezone not provided.")
+# Stats of several sessions at once: a list of indices or "all"
+class BatchSessionStatsRequest(BaseModel):
+    dataset_id: str
+    session_indices: Union[List[int], Literal["all"]] = "all"
+    max_points: Optional[int] = None
+    downsample: str = "lttb"
+
+# Zoomable chart series: one of session_series.SERIES between t0 and t1 (UTC epoch ms,
+# inclusive, as for /best-in-range/; the whole session if omitted) as at most
+# `resolution` buckets, whose start and end are local epoch ms like the other charts
+class SeriesRequest(BaseModel):
+    dataset_id: str
+    session_index: int
+    series: str = "ao100"
+    t0: Optional[int] = None
+    t1: Optional[int] = None
+    resolution: int = 1000
+
+def get_dataset(dataset_id):
+    dataset = datasets.get(dataset_id)
+    if dataset is None:
+        raise HTTPException(status_code=404, detail="Dataset not found. Please upload the file again.")
+    return dataset
+
+def get_session(dataset_id, session_index):
+    """The session a request refers to, or an HTTP error if the dataset or index is unknown."""
+    dataset = get_dataset(dataset_id)
+    if session_index < 0 or session_index >= len(dataset.sessions):
+        raise HTTPException(status_code=400, detail="Session index out of range.")
+
+    return dataset.sessions[session_index]
+
+def dataset_etag(dataset, *parts):
+    """ETag of a response computed from a dataset and the request `parts`."""
+    return make_etag(RESULT_VERSION, dataset.content_hash or dataset.id, dataset.sessions[0].table.timezone_str, *parts)
 
-    # Save uploaded file
+def encode_result(media_type, fn, *args):
+    """fn(*args) encoded as a response body (blocking)."""
+    return wire.encode(fn(*args), media_type)
+
+async def cached_response(request, etag, fn, *args, media_type=wire.JSON):
+    """Response of fn(*args) tagged with `etag`, encoded as `media_type`.
+
+    Answers 304 if the client already holds this ETag, and otherwise serves the body
+    from the result cache, computing it on the analysis pool on a miss.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    body = results.get(etag)
+    if body is None:
+        body = await run_analysis(encode_result, media_type, fn, *args)
+        results.put(etag, body)
+    return Response(body, media_type=media_type, headers=headers)
+
+def negotiate(request):
+    """The response encoding the request's Accept header asks for, or a 406."""
+    media_type = wire.negotiate(request.headers.get("accept"))
+    if media_type is None:
+        raise HTTPException(
+            status_code=406,
+            detail=f"Supported response formats: {', '.join(wire.available())}",
+        )
+    return media_type
+
+async def run_analysis(fn, *args):
+    """Run a blocking analysis function on the analysis pool, or answer 503 if it is full."""
+    try:
+        result = await analysis_pool.run(fn, *args)
+    except PoolBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy analysing other uploads. Please retry shortly.",
+            headers={"Retry-After": str(ANALYSIS_RETRY_AFTER)},
+        )
+    # Analyses cache what they derive with the dataset, so its size may have grown
+    datasets.trim()
+    return result
+
+def save_upload(upload):
+    """Copy an uploaded file to disk under a name no concurrent upload can share (blocking)."""
     upload_folder = "uploads"
     os.makedirs(upload_folder, exist_ok=True)
-    file_location = os.path.join(upload_folder, file.filename)
+    suffix = "-" + os.path.basename(upload.filename or "upload")
+    with tempfile.NamedTemporaryFile(dir=upload_folder, suffix=suffix, delete=False) as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+        return buffer.name
+
+def parse_upload(file_location, timezone):
+    """Sessions and content hash of a saved upload, which is removed afterwards (blocking).
 
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    The parsed table is reused if this exact file was uploaded before.
+    """
+    try:
+        content_hash = upload_cache.hash_file(file_location)
+        sessions = upload_cache.cached_load_all_sessions(
+            file_location, content_hash, timezone_str=timezone, workers=PARSE_WORKERS
+        )
+    finally:
+        os.remove(file_location)
+    return sessions, content_hash
 
-    # Load sessions
-    loaded_sessions = pf.load_all_sessions(file_location, timezone_str=timezone)
+def new_dataset(sessions, content_hash, previous):
+    """A Dataset whose global stats are computed on first request.
 
-    if not loaded_sessions:
+    A re-upload that only appends solves to the client's previous dataset extends a
+    copy of that dataset's scanned stats, if it has any, from the new tail.
+    """
+    base = previous.stats.scanned if previous is not None else None
+    return Dataset(sessions, StatsCache(sessions, base), content_hash)
+
+def load_dataset(upload, timezone, previous, keys):
+    """Save and parse an upload into a new Dataset, computing the requested global stats (blocking).
+
+    Returns:
+        tuple: (Dataset, {key: value} of the requested stats).
+    """
+    sessions, content_hash = parse_upload(save_upload(upload), timezone)
+    if not sessions:
         raise HTTPException(status_code=400, detail="No sessions found in the uploaded file.")
 
-    # Compute global stats once
-    longest_period, max_duration_hours = longest_cubing_period.longest_cubing_period(loaded_sessions)
-    max_date, max_time_hours = max_time_spent_cubing_in_a_day.max_time_spent_cubing_in_day(loaded_sessions)
-    max_solves_date, max_solves = most_solves_in_a_day.most_solves_in_a_day(loaded_sessions)
-    date, counts = pbs_per_day.most_pbs_in_a_day(loaded_sessions)
-    total_solves, event_times = total_time_spent_solving.time_spent_breakup(loaded_sessions)
-    average_period_duration_stats = average_period_duration.average_time_per_day(loaded_sessions)
-    days_dict, hours_dict = most_active_time_of_day.cubing_time_stats_dict(loaded_sessions)
-    consistency_stats = consistency.consistency(loaded_sessions)
-    monthly_breakdown_stats = monthly_breakdown.plot_monthly_event_time_breakdown(loaded_sessions)
-
-    # Prepare cache
-    global_stats_cache = {
-        "longest_cubing_period_stats": (
-            f"Longest time spent cubing at a stretch: {longest_period.session_name} with {len(longest_period.solves)} solves\n"
-            f"Duration: {max_duration_hours:.2f} hours\n"
-            f"Scramble Event: {longest_period.scramble_event}\n"
-            f"Start Date: {longest_period.solves[0].date}\n"
-            f"End Date: {longest_period.solves[-1].date}"
-        ),
-        "max_time_spent_cubing_in_a_day_stats": f"{max_time_hours:.2f} hours on {max_date}",
-        "most_solves_in_a_day_stats": f"Day with the most solves: {max_solves_date} with {max_solves} solves",
-        "most_pbs_in_a_day_stats": f"Date with most PBs: {date}, Counts: {counts[date]}",
-        "pb_stats": counts,
-        "total_solves_stats": total_solves,
-        "event_times_stats": event_times,
-        "average_period_duration_stats": f"Average time spent per day: {average_period_duration_stats:.2f} minutes",
-        "days_dict_stats": days_dict,
-        "hours_dict_stats": hours_dict,
-        "consistency_stats": consistency_stats,
-        "session_names": [session.name for session in loaded_sessions],
-        "monthly_breakdown_stats": monthly_breakdown_stats,
-    }
+    dataset = new_dataset(sessions, content_hash, previous)
+    return dataset, dataset.stats.get(keys)
 
-    return {
-        "message": "File uploaded and global stats calculated",
-        **global_stats_cache,
-    }
+def run_upload_job(job, file_location, timezone, previous):
+    """Parse and analyse a saved upload stage by stage, publishing each stat on the job (blocking)."""
+    try:
+        job.start("parse")
+        sessions, content_hash = parse_upload(file_location, timezone)
+        if not sessions:
+            job.fail("No sessions found in the uploaded file.")
+            return
+        # Stored straight away so session stats can be fetched while global stats are computed
+        dataset = new_dataset(sessions, content_hash, previous)
+        datasets.put(dataset)
+        job.dataset_id = dataset.id
+        job.finish("parse", dataset.stats.get(["session_names"]))
 
-@app.post("/session-stats/")
-async def session_stats(request: SessionIndexRequest):
-    global loaded_sessions
+        dataset.stats.scan(job.advance)
+        for stage in ("periods", "pbs"):
+            if job.stages[stage]["status"] != "done":  # already scanned for an earlier request
+                job.finish(stage)
+        for group in UPLOAD_STAGES[3:]:
+            job.start(group)
+            job.finish(group, dataset.stats.get(STAT_GROUPS[group]))
+        datasets.trim()
+    except Exception as e:
+        job.fail(str(e) or type(e).__name__)
 
-    if not loaded_sessions:
-        raise HTTPException(status_code=400, detail="No sessions loaded. Please upload file first.")
+def parse_stat_keys(stats):
+    """Global stat keys from a comma-separated `stats` parameter, or None (all of them) if omitted."""
+    if stats is None:
+        return None
+    keys = [key.strip() for key in stats.split(",") if key.strip()]
+    unknown = [key for key in keys if key not in STAT_KEY_GROUPS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown stats: {', '.join(unknown)}")
+    return keys
 
-    idx = request.session_index
-    if idx < 0 or idx >= len(loaded_sessions):
-        raise HTTPException(status_code=400, detail="Session index out of range.")
+def compute_session_stats(session, columnar=False, max_points=None, method="lttb"):
+    """Every per-session stat shown on the dashboard (blocking).
 
-    session = loaded_sessions[idx]
+    With columnar=True, the progressions and percentile bands are numpy arrays of
+    local epoch-ms timestamps and seconds instead of dicts and lists keyed by date.
+    With max_points, each of those series is downsampled to at most that many points.
+    """
+    when, averages, pb_when, pb_values = plot_improvement.progression_arrays(session, [100])[100]
+    band_when, bands = plot_improvement.percentile_band_arrays(session, 200)
+    if max_points is not None:
+        keep = downsample(when, averages, max_points, method)
+        when, averages = when[keep], averages[keep]
+        keep = downsample(pb_when, pb_values, max_points, method)
+        pb_when, pb_values = pb_when[keep], pb_values[keep]
+        keep = downsample(band_when, bands[:, 1], max_points, method)
+        band_when, bands = band_when[keep], bands[keep]
 
-    ao100_dict = plot_improvement.create_avg_dict(session, 100)
-    ao100_pb_dict = plot_improvement.create_pb_dict(session, 100)
+    if columnar:
+        ao100_dict = {"timestamps": when, "values": averages}
+        ao100_pb_dict = {"timestamps": pb_when, "values": pb_values}
+    else:
+        ao100_dict = plot_improvement.series_dict(when, averages)
+        ao100_pb_dict = plot_improvement.series_dict(pb_when, pb_values)
+    percentile_bands = plot_improvement.bands_dict(200, band_when, bands, columnar=columnar)
     solve_levels = solve_level.solve_levels_from_sessions([session])
     time_distribution_dict = time_distribution(session)
 
@@ -127,4 +282,277 @@ async def session_stats(request: SessionIndexRequest):
         "ao100_pb_progression": ao100_pb_dict,
         "solve_levels_stats": solve_levels,
         "time_distribution_dict":time_distribution_dict,
+        "percentile_bands": percentile_bands,
     }
+
+def best_in_range_dict(session, n, t0, t1):
+    return {
+        "session_name": session.name,
+        "n": n,
+        "best": best_in_range.best_in_range(session, n, t0, t1),
+    }
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "analysis_jobs": analysis_pool.pending,
+        "analysis_capacity": analysis_pool.max_pending,
+        "datasets": len(datasets),
+        "cached_results": len(results),
+    }
+
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found.")
+    return job
+
+@app.post("/upload-jobs/")
+async def start_upload_job(
+    file: UploadFile = File(...),
+    timezone: str = Form(...),
+    previous_dataset_id: Optional[str] = Form(None),
+):
+    """Start analysing an upload in the background and return its job id straight away.
+
+    Progress is available from /upload-jobs/{job_id} (polling) or
+    /upload-jobs/{job_id}/events (server-sent events), and every stat from
+    /upload-jobs/{job_id}/stats/{key} once it is listed as ready.
+    """
+    if not timezone:
+        raise HTTPException(status_code=400, detail="Timezone not provided.")
+
+    previous = datasets.get(previous_dataset_id) if previous_dataset_id else None
+    # The upload has to be read before this request ends, the analysis does not
+    file_location = await run_analysis(save_upload, file)
+    job = UploadJob(UPLOAD_STAGES)
+    try:
+        analysis_pool.submit(run_upload_job, job, file_location, timezone, previous)
+    except PoolBusy:
+        os.remove(file_location)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy analysing other uploads. Please retry shortly.",
+            headers={"Retry-After": str(ANALYSIS_RETRY_AFTER)},
+        )
+    jobs.put(job)
+    return job.snapshot()
+
+@app.get("/upload-jobs/{job_id}")
+async def upload_job_status(job_id: str):
+    return get_job(job_id).snapshot()
+
+@app.get("/upload-jobs/{job_id}/events")
+async def upload_job_events(job_id: str):
+    """Server-sent "progress" events carrying a job snapshot whenever the job changes,
+    ending with the snapshot in which it is done or failed."""
+    job = get_job(job_id)
+
+    async def events():
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                snapshot = job.snapshot()
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+                if snapshot["status"] in ("done", "failed"):
+                    return
+            await asyncio.sleep(JOB_EVENTS_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/upload-jobs/{job_id}/stats/{key}")
+async def upload_job_stat(job_id: str, key: str):
+    job = get_job(job_id)
+    if key not in STAT_KEY_GROUPS:
+        raise HTTPException(status_code=404, detail=f"Unknown stat: {key}")
+    if key not in job.results:
+        raise HTTPException(status_code=409, detail=f"{key} is not ready yet.")
+    return {key: job.results[key]}
+
+@app.post("/upload-solves/")
+async def upload_solves(
+    file: UploadFile = File(...),
+    timezone: str = Form(...),
+    previous_dataset_id: Optional[str] = Form(None),
+    stats: Optional[str] = Form(None),
+):
+    """Parse an upload and return the global stats named in `stats` (comma-separated;
+    all of them if omitted). session_names is always included; every other stat can
+    be fetched later from /datasets/{dataset_id}/stats/."""
+    if not timezone:
+        raise HTTPException(status_code=400, detail="Timezone not provided.")
+    keys = parse_stat_keys(stats)
+    if keys is not None and "session_names" not in keys:
+        keys.append("session_names")
+
+    previous = datasets.get(previous_dataset_id) if previous_dataset_id else None
+    dataset, values = await run_analysis(load_dataset, file, timezone, previous, keys)
+    datasets.put(dataset)
+
+    return {
+        "message": "File uploaded and global stats calculated",
+        "dataset_id": dataset.id,
+        **values,
+    }
+
+@app.get("/datasets/{dataset_id}/stats/")
+async def dataset_stats(request: Request, dataset_id: str, stats: Optional[str] = None):
+    """Global stats of an uploaded dataset, computed on first request and memoized.
+
+    `stats` is a comma-separated list of keys; all stats are returned if it is omitted.
+    """
+    dataset = get_dataset(dataset_id)
+    keys = parse_stat_keys(stats)
+    etag = dataset_etag(dataset, "stats", keys)
+    return await cached_response(request, etag, dataset.stats.get, keys)
+
+@app.get("/datasets/{dataset_id}/stats/{key}")
+async def dataset_stat(request: Request, dataset_id: str, key: str):
+    dataset = get_dataset(dataset_id)
+    if key not in STAT_KEY_GROUPS:
+        raise HTTPException(status_code=404, detail=f"Unknown stat: {key}")
+    return await cached_response(request, dataset_etag(dataset, "stats", [key]), dataset.stats.get, [key])
+
+def check_downsampling(params):
+    if params.max_points is not None and params.max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3.")
+    if params.downsample not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"downsample must be one of: {', '.join(DOWNSAMPLE_METHODS)}")
+
+def session_stats_etag(dataset, session_index, media_type, params):
+    return dataset_etag(
+        dataset, "session-stats", session_index, media_type,
+        params.max_points, params.downsample if params.max_points is not None else None,
+    )
+
+async def cached_session_stats(request, params):
+    """Session stats in the encoding negotiated from the Accept header: JSON by
+    default, or one of the columnar encodings in utils/wire_format.py."""
+    session = get_session(params.dataset_id, params.session_index)
+    check_downsampling(params)
+    media_type = negotiate(request)
+    etag = session_stats_etag(get_dataset(params.dataset_id), params.session_index, media_type, params)
+    return await cached_response(
+        request, etag, compute_session_stats, session, media_type in wire.COLUMNAR,
+        params.max_points, params.downsample, media_type=media_type,
+    )
+
+@app.post("/session-stats/")
+async def session_stats(request: Request, body: SessionIndexRequest):
+    return await cached_session_stats(request, body)
+
+@app.get("/session-stats/")
+async def session_stats_get(request: Request, params: SessionIndexRequest = Depends()):
+    """Same as POST /session-stats/, but cacheable by the browser, which revalidates
+    its copy with If-None-Match."""
+    return await cached_session_stats(request, params)
+
+@app.post("/session-stats/batch")
+async def session_stats_batch(body: BatchSessionStatsRequest):
+    """Stats of several sessions ("all" by default), computed concurrently on the
+    analysis pool and streamed as NDJSON in completion order, one
+    {"session_index": i, "stats": {...}} (or "error") line per session.
+
+    Each line's stats are the JSON body of /session-stats/ for that session, shared
+    with its result cache.
+    """
+    dataset = get_dataset(body.dataset_id)
+    check_downsampling(body)
+    if body.session_indices == "all":
+        indices = list(range(len(dataset.sessions)))
+    else:
+        indices = list(dict.fromkeys(body.session_indices))
+        if any(index < 0 or index >= len(dataset.sessions) for index in indices):
+            raise HTTPException(status_code=400, detail="Session index out of range.")
+    # Fail before streaming starts if the pool cannot take anything
+    if indices and analysis_pool.pending >= analysis_pool.max_pending:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy analysing other uploads. Please retry shortly.",
+            headers={"Retry-After": str(ANALYSIS_RETRY_AFTER)},
+        )
+
+    def line(index, body=None, error=None):
+        if error is not None:
+            return json.dumps({"session_index": index, "error": error}).encode() + b"\n"
+        return b'{"session_index":%d,"stats":' % index + body + b"}\n"
+
+    async def lines():
+        waiting = []
+        for index in indices:
+            etag = session_stats_etag(dataset, index, wire.JSON, body)
+            cached = results.get(etag)
+            if cached is not None:
+                yield line(index, cached)
+            else:
+                waiting.append((index, etag))
+
+        # At most one session per worker in flight, so other requests still get a turn
+        running = {}
+        while waiting or running:
+            while waiting and len(running) < analysis_pool.workers:
+                index, etag = waiting[0]
+                try:
+                    future = analysis_pool.submit(
+                        encode_result, wire.JSON, compute_session_stats, dataset.sessions[index],
+                        False, body.max_points, body.downsample,
+                    )
+                except PoolBusy:
+                    break
+                running[future] = (index, etag)
+                waiting.pop(0)
+            if not running:
+                await asyncio.sleep(BATCH_RETRY_INTERVAL)
+                continue
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index, etag = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield line(index, error=str(e) or type(e).__name__)
+                    continue
+                results.put(etag, result)
+                yield line(index, result)
+        datasets.trim()
+
+    # Content-Encoding keeps the gzip middleware from holding lines back in its buffer
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Content-Encoding": "identity"})
+
+@app.get("/series")
+async def series(request: Request, params: SeriesRequest = Depends()):
+    """Min/max/mean buckets of a session series for zooming and panning a chart,
+    answered from a pyramid built on the first request for that series."""
+    session = get_session(params.dataset_id, params.session_index)
+    if params.series not in session_series.SERIES:
+        raise HTTPException(status_code=400, detail=f"series must be one of: {', '.join(session_series.SERIES)}")
+    if params.resolution < 1:
+        raise HTTPException(status_code=400, detail="resolution must be at least 1.")
+    if params.t0 is not None and params.t1 is not None and params.t0 > params.t1:
+        raise HTTPException(status_code=400, detail="t0 must not be after t1.")
+
+    media_type = negotiate(request)
+    etag = dataset_etag(
+        get_dataset(params.dataset_id), "series", params.session_index, params.series,
+        params.t0, params.t1, params.resolution, media_type,
+    )
+    return await cached_response(
+        request, etag, session_series.session_series, session, params.series,
+        params.t0, params.t1, params.resolution, media_type=media_type,
+    )
+
+@app.post("/best-in-range/")
+async def best_in_range_stats(request: Request, body: BestInRangeRequest):
+    session = get_session(body.dataset_id, body.session_index)
+    if body.n not in best_in_range.SUPPORTED_NS:
+        raise HTTPException(status_code=400, detail=f"n must be one of: {', '.join(map(str, best_in_range.SUPPORTED_NS))}")
+    if body.t0 > body.t1:
+        raise HTTPException(status_code=400, detail="t0 must not be after t1.")
+
+    etag = dataset_etag(get_dataset(body.dataset_id), "best-in-range", body.session_index, body.n, body.t0, body.t1)
+    try:
+        return await cached_response(request, etag, best_in_range_dict, session, body.n, body.t0, body.t1)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,26 +1,34 @@
 import utils.preprocess_solves as pf
+import utils.timezones as tzs
 
-def max_time_spent_cubing_in_day(sessions):
-    """Calculate the maximum time spent cubing in a single day from the provided cubing periods.
-
-    Args:
-        cubing_periods (list): List of CubingPeriod objects containing solves.
-    """
-    cubing_periods = pf.load_all_cubing_periods(sessions)
-    daily_time_spent = {}
+def new_state():
+    return {}  # local day -> seconds spent cubing
 
+def accumulate(daily_time_spent, cubing_periods):
+    """Add the duration of more cubing periods to the day each one started on."""
     for period in cubing_periods:
-        date = period.solves[0].date.split(" ")[0]  # extract only the date part "YYYY-MM-DD"
+        date = period.local_day
         time_spent = period.time_spent() * 60  # convert minutes to seconds
 
         if date not in daily_time_spent:
             daily_time_spent[date] = 0
         daily_time_spent[date] += time_spent
 
+def finalize(daily_time_spent):
     max_time = max(daily_time_spent.values())
     max_date = [date for date, time in daily_time_spent.items() if time == max_time][0]
 
-    return max_date, max_time / 3600  # return date and time in hours
+    return tzs.format_day(max_date), max_time / 3600  # return date and time in hours
+
+def max_time_spent_cubing_in_day(sessions):
+    """Calculate the maximum time spent cubing in a single day from the provided cubing periods.
+
+    Args:
+        cubing_periods (list): List of CubingPeriod objects containing solves.
+    """
+    daily_time_spent = new_state()
+    accumulate(daily_time_spent, pf.load_all_cubing_periods(sessions))
+    return finalize(daily_time_spent)
 
 if __name__ == "__main__":
     #cubing_periods = pf.load_all_cubing_periods()
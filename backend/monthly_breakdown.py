@@ -1,54 +1,50 @@
 # utils/plot_monthly_breakdown.py
 
 from collections import defaultdict
-from datetime import datetime
 import matplotlib.pyplot as plt
-from dateutil.relativedelta import relativedelta
 import utils.preprocess_solves as pf
+import utils.timezones as tzs
 from utils.preprocess_solves import get_cubing_periods
 
-def month_key(date: datetime) -> str:
-    """Helper to convert a datetime into a 'YYYY-MM' key."""
-    return date.strftime('%Y-%m')
+def month_key(month: int) -> str:
+    """Helper to convert a month number (months since 1970-01) into a 'YYYY-MM' key."""
+    return tzs.format_month(month)
 
-def plot_monthly_event_time_breakdown(sessions):
-    # monthly_event_times[month][event] = total duration (in seconds)
-    monthly_event_times = defaultdict(lambda: defaultdict(float))
-    all_dates = []
+def new_state():
+    # monthly_event_times[month][event] = total duration (in minutes)
+    return {"monthly_event_times": defaultdict(lambda: defaultdict(float)), "min_month": None, "max_month": None}
 
-    for session in sessions:
-        periods = get_cubing_periods(session)
-        for period in periods:
-            if not period.solves:
-                continue
+def accumulate(state, periods):
+    """Add the duration of more cubing periods to their month and event."""
+    monthly_event_times = state["monthly_event_times"]
+    for period in periods:
+        if not len(period):
+            continue
 
-            # Use the time_spent method, which returns minutes spent
-            duration_minutes = period.time_spent()
-            # Fix negative or zero duration: if duration < 0 or 0, fallback to minimal duration (e.g., 1 minute)
-            if duration_minutes <= 0:
-                # This can happen if only one solve or timestamp issues,
-                # We can approximate duration by adding a minimal default like 1 minute per solve
-                duration_minutes = max(1, len(period.solves))  # at least 1 minute per solve
+        # Use the time_spent method, which returns minutes spent
+        duration_minutes = period.time_spent()
+        # Fix negative or zero duration: if duration < 0 or 0, fallback to minimal duration (e.g., 1 minute)
+        if duration_minutes <= 0:
+            # This can happen if only one solve or timestamp issues,
+            # We can approximate duration by adding a minimal default like 1 minute per solve
+            duration_minutes = max(1, len(period))  # at least 1 minute per solve
 
-            first_time = datetime.strptime(period.solves[0].date, '%Y-%m-%d %H:%M:%S')
-            month = month_key(first_time)
-            event = period.scramble_event
-            monthly_event_times[month][event] += duration_minutes
-            all_dates.append(first_time)
+        month = period.local_month
+        event = period.scramble_event
+        monthly_event_times[month][event] += duration_minutes
+        if state["min_month"] is None or month < state["min_month"]:
+            state["min_month"] = month
+        if state["max_month"] is None or month > state["max_month"]:
+            state["max_month"] = month
 
-    if not all_dates:
+def finalize(state):
+    monthly_event_times = state["monthly_event_times"]
+    if state["min_month"] is None:
         print("No cubing data found.")
         return {}
 
     # Ensure all months are represented
-    min_month = datetime(min(all_dates).year, min(all_dates).month, 1)
-    max_month = datetime(max(all_dates).year, max(all_dates).month, 1)
-
-    months = []
-    current = min_month
-    while current <= max_month:
-        months.append(month_key(current))
-        current += relativedelta(months=1)
+    months = list(range(state["min_month"], state["max_month"] + 1))
 
     # Get all event types
     all_events = sorted({event for month in monthly_event_times for event in monthly_event_times[month]})
@@ -82,11 +78,17 @@ def plot_monthly_event_time_breakdown(sessions):
 
     # Return raw dictionary (converted to hours)
     monthly_hours = {
-        month: {event: monthly_event_times[month].get(event, 0) / 60 for event in all_events}
+        month_key(month): {event: monthly_event_times[month].get(event, 0) / 60 for event in all_events}
         for month in months
     }
     return monthly_hours
 
+def plot_monthly_event_time_breakdown(sessions):
+    state = new_state()
+    for session in sessions:
+        accumulate(state, get_cubing_periods(session))
+    return finalize(state)
+
 if __name__ == "__main__":
     # Example usage with real data file path
     sessions = pf.load_all_sessions(filepath="data/suku.txt")
@@ -2,19 +2,23 @@ from datetime import datetime, timedelta
 from collections import defaultdict, OrderedDict
 import calendar
 from utils.preprocess_solves import load_all_sessions, load_all_cubing_periods
+import utils.timezones as tzs
 import platform
 
 
-def cubing_time_stats_dict(sessions):
-    cubing_periods = load_all_cubing_periods(sessions)
+def new_state():
     time_per_hour = defaultdict(float)     # key: int hour 0-23
     time_per_weekday = defaultdict(float)  # key: weekday int (0=Monday)
+    return time_per_hour, time_per_weekday
 
+def accumulate(state, cubing_periods):
+    """Spread the duration of more cubing periods over the hours and weekdays they cover."""
+    time_per_hour, time_per_weekday = state
     for period in cubing_periods:
-        if not period.solves:
+        if not len(period):
             continue
-        start_dt = datetime.strptime(period.solves[0].date, '%Y-%m-%d %H:%M:%S')
-        end_dt = datetime.strptime(period.solves[-1].date, '%Y-%m-%d %H:%M:%S')
+        start_dt = tzs.local_datetime(period.local_timestamps[0])
+        end_dt = tzs.local_datetime(period.local_timestamps[-1])
 
         current = start_dt
         while current < end_dt:
@@ -30,6 +34,9 @@ def cubing_time_stats_dict(sessions):
 
             current = next_hour
 
+def finalize(state):
+    time_per_hour, time_per_weekday = state
+
     # Convert weekday int (0–6) to names like "monday"
     time_per_weekday_named = {
         calendar.day_name[k].lower(): round(v, 2) for k, v in sorted(time_per_weekday.items())
@@ -52,6 +59,11 @@ def cubing_time_stats_dict(sessions):
 
     return time_per_weekday_named, time_per_hour_named
 
+def cubing_time_stats_dict(sessions):
+    state = new_state()
+    accumulate(state, load_all_cubing_periods(sessions))
+    return finalize(state)
+
 
 if __name__ == "__main__":
     sessions = load_all_sessions("data/suku.txt")
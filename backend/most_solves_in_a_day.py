@@ -1,25 +1,34 @@
 import utils.preprocess_solves as pf
+import utils.timezones as tzs
 
-def most_solves_in_a_day(sessions):
-    """Calculate the day with the most solves from the provided cubing periods.
+def new_state():
+    return {}  # local day -> number of solves
 
-    Args:
-        cubing_periods (list): List of CubingPeriod objects containing solves.
-    """
-    daily_solve_count = {}
-    cubing_periods = pf.load_all_cubing_periods(sessions)
+def accumulate(daily_solve_count, cubing_periods):
+    """Add the solves of more cubing periods to the day each one started on."""
     for period in cubing_periods:
-        date = period.solves[0].date.split(" ")[0]  # extract only the date part "YYYY-MM-DD"
-        solve_count = len(period.solves)
+        date = period.local_day
+        solve_count = len(period)
 
         if date not in daily_solve_count:
             daily_solve_count[date] = 0
         daily_solve_count[date] += solve_count
 
+def finalize(daily_solve_count):
     max_solves = max(daily_solve_count.values())
     max_date = [date for date, count in daily_solve_count.items() if count == max_solves][0]
 
-    return max_date, max_solves  # return date and number of solves
+    return tzs.format_day(max_date), max_solves  # return date and number of solves
+
+def most_solves_in_a_day(sessions):
+    """Calculate the day with the most solves from the provided cubing periods.
+
+    Args:
+        cubing_periods (list): List of CubingPeriod objects containing solves.
+    """
+    daily_solve_count = new_state()
+    accumulate(daily_solve_count, pf.load_all_cubing_periods(sessions))
+    return finalize(daily_solve_count)
 
 if __name__ == "__main__":
     cubing_periods = pf.load_all_cubing_periods(pf.load_all_sessions(filepath="data/real.txt"))
@@ -1,72 +1,140 @@
+import numpy as np
 import utils.preprocess_solves as pf
+import utils.rolling_average as ra
 
-def singlePBs(sessions):
-    current_pb = float('inf')
-    pb_list = []
-    for s in sessions:
-        for solve in s.solves:
-            if solve.time > 0 and solve.time <= current_pb:
-                current_pb = solve.time
-                pb_list.append((solve, current_pb))
+# PBs are detected in one pass per session and emitted as typed events in a
+# structured array. A PB type is (kind, n): the best single, the mean of n
+# (DNF if any solve is a DNF) or the WCA trimmed average of n (DNF once more
+# solves are DNF than are trimmed). Every solve counts, +2 included, and a PB
+# has to be strictly better than the previous one of its type in the session.
+PB_SINGLE = 0
+PB_MEAN = 1
+PB_AVERAGE = 2
 
-    return pb_list
+PB_TYPES = ((PB_SINGLE, 1), (PB_MEAN, 3), (PB_AVERAGE, 5), (PB_AVERAGE, 12), (PB_AVERAGE, 100))
 
-def ao5PBs(sessions):
-    pb_list = []
-    for s in sessions:
-        current_pb = float('inf')
-        for i in range(len(s.solves) - 4):  # need 5 solves
-            ao5_solves = s.solves[i:i+5]
-            times = [solve.time for solve in ao5_solves if solve.time > 0]
-            if len(times) < 5:
-                continue
-
-            sorted_times = sorted(times)
-            avg = sum(sorted_times[1:-1]) / 3  # remove best and worst
-
-            if avg < current_pb:
-                current_pb = avg
-                pb_list.append((ao5_solves, avg))
-    return pb_list
-
-def ao12PBs(sessions):
-    pb_list = []
-    for s in sessions:
-        current_pb = float('inf')
-        for i in range(len(s.solves) - 11):  # need 5 solves
-            ao12_solves = s.solves[i:i+12]
-            times = [solve.time for solve in ao12_solves if solve.penalty == 0]
-            if len(times) < 12:
-                continue
-
-            sorted_times = sorted(times)
-            avg = sum(sorted_times[1:-1]) / 10  # remove best and worst
-
-            if avg < current_pb:
-                current_pb = avg
-                pb_list.append((ao12_solves, avg))
-    return pb_list
-
-def ao100PBs(sessions):
-    pb_list = []
+PB_EVENT_DTYPE = np.dtype([
+    ('when', np.int64),     # local epoch ms of the solve that set the PB (the last solve of an average)
+    ('row', np.int32),      # that solve's row within its session
+    ('session', np.int32),  # index of the session in the list that was scanned
+    ('event', np.int16),    # event id in the solve table
+    ('kind', np.int8),      # PB_SINGLE, PB_MEAN or PB_AVERAGE
+    ('n', np.int16),        # number of solves (1 for singles)
+    ('value', np.float64),  # seconds
+])
+
+def pb_type_name(kind, n):
+    if kind == PB_SINGLE:
+        return "single"
+    return f"{'mo' if kind == PB_MEAN else 'ao'}{n}"
+
+def _running_pbs(values, best):
+    """Rows where `values` is strictly below everything before it and below `best`."""
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    previous = np.minimum.accumulate(np.concatenate(([best], values[:-1])))
+    return np.flatnonzero(values < previous)
+
+def session_pb_events(session, session_index=0, types=PB_TYPES, start=0, bests=None):
+    """PB events of one session.
+
+    Singles and means are found with vectorized running minimums, and all the
+    trimmed averages share one pass of the rolling average engine.
+
+    Args:
+        session (Session): Session to scan.
+        session_index (int): Value for the `session` field of the events.
+        types (tuple): (kind, n) PB types to look for.
+        start (int): Only report PBs set at or after this row, e.g. when resuming
+            after solves were appended.
+        bests (list): Current PB of each type to beat, aligned with `types`.
+
+    Returns:
+        tuple: (PB_EVENT_DTYPE array in solve order, updated list of bests).
+    """
+    bests = list(bests) if bests is not None else [float('inf')] * len(types)
+    longest = max((n for _, n in types), default=1)
+    first = max(0, start - longest + 1)
+    values = ra.effective_ms(session.times_ms[first:], session.penalties[first:])
+
+    found = []  # (type index, rows relative to `first`, values)
+    average_bests = {n: bests[i] for i, (kind, n) in enumerate(types) if kind == PB_AVERAGE}
+    scans = ra.scan_averages(values, list(average_bests), bests=average_bests, pb_start=start - first)
+    for i, (kind, n) in enumerate(types):
+        if kind == PB_AVERAGE:
+            pbs = scans[n][1]
+            rows = np.array([row for row, _ in pbs], dtype=np.int64)
+            pb_values = np.array([avg for _, avg in pbs], dtype=np.float64)
+        else:
+            if kind == PB_SINGLE:
+                series = np.where(values == ra.DNF_MS, np.inf, values / 1000)
+            else:
+                # Windows that end before the n-th solve have no mean
+                series = np.concatenate((np.full(min(n - 1, len(values)), np.inf), ra.batch_means(values, n)))
+            series = np.where(np.arange(len(series)) >= start - first, series, np.inf)
+            rows = _running_pbs(series, bests[i])
+            pb_values = series[rows]
+        if len(rows):
+            bests[i] = float(pb_values[-1])
+        found.append((i, rows, pb_values))
+
+    events = np.zeros(sum(len(rows) for _, rows, _ in found), dtype=PB_EVENT_DTYPE)
+    order = np.zeros(len(events), dtype=np.int64)
+    when = session.local_timestamps[first:]
+    event_ids = session.table.event_ids[session.start + first:session.stop]
+    pos = 0
+    for i, rows, pb_values in found:
+        kind, n = types[i]
+        chunk = events[pos:pos + len(rows)]
+        chunk['when'] = when[rows]
+        chunk['row'] = rows + first
+        chunk['session'] = session_index
+        chunk['event'] = event_ids[rows]
+        chunk['kind'] = kind
+        chunk['n'] = n
+        chunk['value'] = pb_values
+        order[pos:pos + len(rows)] = i
+        pos += len(rows)
+    return events[np.lexsort((order, events['row']))], bests
+
+def pb_events(sessions, types=PB_TYPES):
+    """PB events of every session, concatenated in session order."""
+    parts = [session_pb_events(session, index, types)[0] for index, session in enumerate(sessions)]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=PB_EVENT_DTYPE)
+
+def pb_list(events, kind, n):
+    """(local_timestamp, value) pairs of the events of one PB type."""
+    selected = events[(events['kind'] == kind) & (events['n'] == n)]
+    return list(zip(selected['when'].tolist(), selected['value'].tolist()))
+
+# Each PB list holds (local_timestamp, value) pairs, where local_timestamp is the
+# local epoch-ms time of the solve that set the PB (the last solve of an average).
+
+def _pbs_of_type(sessions, kind, n, start, current_pb):
+    pbs = []
     for s in sessions:
-        current_pb = float('inf')
-        for i in range(len(s.solves) - 99):  # need 100 solves
-            ao100_solves = s.solves[i:i+100]
-            times = [solve.time for solve in ao100_solves if solve.time > 0]
-            if len(times) < 100:
-                continue
+        events, _ = session_pb_events(s, 0, ((kind, n),), start, [current_pb])
+        pbs.extend(pb_list(events, kind, n))
+    return pbs
 
-            sorted_times = sorted(times)
-            avg = sum(sorted_times[5:-5]) / 90  # remove top 5 and bottom 5
+def singlePBs(sessions, start=0, current_pb=float('inf')):
+    return _pbs_of_type(sessions, PB_SINGLE, 1, start, current_pb)
 
-            if avg < current_pb:
-                current_pb = avg
-                pb_list.append((ao100_solves, avg))
-    return pb_list
+def averagePBs(sessions, n, start=0, current_pb=float('inf')):
+    """PB progression of the trimmed aoN, one sliding window per session."""
+    return _pbs_of_type(sessions, PB_AVERAGE, n, start, current_pb)
+
+def ao5PBs(sessions, start=0, current_pb=float('inf')):
+    return averagePBs(sessions, 5, start, current_pb)
+
+def ao12PBs(sessions, start=0, current_pb=float('inf')):
+    return averagePBs(sessions, 12, start, current_pb)
+
+def ao100PBs(sessions, start=0, current_pb=float('inf')):
+    return averagePBs(sessions, 100, start, current_pb)
 
 if __name__ == "__main__":
     sessions = [pf.load_all_sessions("data/suku.txt")[0]]
-    pb_list = singlePBs(sessions)
-
-    print(pb_list)
+    events = pb_events(sessions)
+    for kind, n in PB_TYPES:
+        print(pb_type_name(kind, n), pb_list(events, kind, n)[-1:])
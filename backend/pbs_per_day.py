@@ -1,5 +1,7 @@
 import utils.preprocess_solves as pf
+import utils.timezones as tzs
 import pb_checker
+import numpy as np
 from datetime import datetime
 import matplotlib.pyplot as plt
 
@@ -31,51 +33,41 @@ def plot_counts_over_time(data: dict):
     plt.tight_layout()
     plt.show()
 
-def most_pbs_in_a_day(sessions):
-    """Find the day with the most personal bests (PBs) across all sessions."""
-    pb_counts = {}
-    
-    for session in sessions:
-        pbs = pb_checker.singlePBs([session])
-        for solve, _ in pbs:
-            date = solve.date.split(' ')[0]
-            if date not in pb_counts:
-                pb_counts[date] = 1
-            pb_counts[date] += 1
+# PB types counted by most_pbs_in_a_day (mo3 PBs are in the event stream but not counted here)
+COUNTED_TYPES = (
+    (pb_checker.PB_SINGLE, 1),
+    (pb_checker.PB_AVERAGE, 5),
+    (pb_checker.PB_AVERAGE, 12),
+    (pb_checker.PB_AVERAGE, 100),
+)
 
-        pbs = pb_checker.ao5PBs([session])
+def _count_by(keys, label):
+    values, counts = np.unique(keys, return_counts=True)
+    return {label(value): count for value, count in zip(values.tolist(), counts.tolist())}
 
-        for average, _ in pbs:
-            solve = average[-1]
-            # Assuming the last solve in the average is the one that counts for the date
-            date = solve.date.split(' ')[0]  # Extract date part
-            if date not in pb_counts:
-                pb_counts[date] = 0
-            pb_counts[date] += 1
+def pbs_per_day(events):
+    """PB counts per local day ('YYYY-MM-DD'), from a pb_checker event array."""
+    return _count_by(tzs.local_days(events['when']), tzs.format_day)
 
-        pbs = pb_checker.ao12PBs([session])
+def pbs_per_month(events):
+    """PB counts per local month ('YYYY-MM')."""
+    return _count_by(tzs.local_months(events['when']), tzs.format_month)
 
-        for average, _ in pbs:
-            solve = average[-1]
-            # Assuming the last solve in the average is the one that counts for the date
-            date = solve.date.split(' ')[0]  # Extract date part
-            if date not in pb_counts:
-                pb_counts[date] = 0
-            pb_counts[date] += 1
+def pbs_per_event(events, event_names):
+    """PB counts per event, given the solve table's list of event names."""
+    return _count_by(events['event'], lambda event_id: event_names[event_id] if event_id >= 0 else "Unknown")
 
-        pbs = pb_checker.ao100PBs([session])
-
-        for average, _ in pbs:
-            solve = average[-1]
-            # Assuming the last solve in the average is the one that counts for the date
-            date = solve.date.split(' ')[0]  # Extract date part
-            if date not in pb_counts:
-                pb_counts[date] = 0
-            pb_counts[date] += 1
-    
-    # Find the date with the maximum PB count
+def most_pbs(events):
+    """The day with the most PBs among `events`, and the per-day counts."""
+    pb_counts = pbs_per_day(events)
+    # Find the date with the maximum PB count (the earliest one on a tie)
     max_date = max(pb_counts, key=pb_counts.get)
-    return max_date, pb_counts 
+    return max_date, pb_counts
+
+def most_pbs_in_a_day(sessions):
+    """Find the day with the most personal bests (PBs) across all sessions."""
+    return most_pbs(pb_checker.pb_events(sessions, COUNTED_TYPES))
+
 # Example usage:
 if __name__ == "__main__":
     sessions = pf.load_all_sessions("data/suku.txt")  # Load all sessions from the file
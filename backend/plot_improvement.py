@@ -1,6 +1,8 @@
-import pb_checker
 import utils.preprocess_solves as pf
+import utils.rolling_average as ra
+import utils.timezones as tzs
 from datetime import datetime
+import numpy as np
 import matplotlib.pyplot as plt
 
 def plot_improvement(avg_dict, title="Average Over Time", ylabel="Average Time (s)"):
@@ -22,61 +24,135 @@ def plot_improvement(avg_dict, title="Average Over Time", ylabel="Average Time (
 
 def compute_trimmed_average(times, n):
     """Trimmed average according to WCA rules."""
-    trim_count = 1 if n in [5, 12] else 5 if n == 100 else int(n * 0.05)
+    trim_count = ra.trim_count(n)
     if 2 * trim_count >= len(times):
         raise ValueError("Too few solves to compute a trimmed average.")
     sorted_times = sorted(times)
     trimmed = sorted_times[trim_count:-trim_count]
     return sum(trimmed) / len(trimmed)
 
+def avg_rows(session, n, valid=None):
+    """Every aoN of a session computed in one batch.
+
+    Returns:
+        tuple: (row of the last solve of each average, float64 averages in seconds),
+        skipping windows without an average.
+    """
+    if 2 * ra.trim_count(n) >= n:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    values = ra.effective_ms(session.times_ms, session.penalties)
+    averages = ra.batch_averages(values, n, valid)
+    keep = np.flatnonzero(~np.isnan(averages))
+    return keep + (n - 1), averages[keep]
+
+def avg_arrays(session, n, valid=None):
+    """Every aoN of a session as (local epoch-ms timestamps of the last solve of each
+    average, float64 averages in seconds), skipping windows without an average."""
+    rows, averages = avg_rows(session, n, valid)
+    return session.local_timestamps[rows], averages
+
+def pb_rows(session, n):
+    """aoN PB progression of a session as (rows of the last solve, averages) arrays."""
+    rows, averages = avg_rows(session, n)
+    if not len(averages):
+        return rows, averages
+    previous_best = np.minimum.accumulate(np.concatenate(([np.inf], averages[:-1])))
+    pb = averages < previous_best
+    return rows[pb], averages[pb]
+
+def pb_arrays(session, n):
+    """aoN PB progression of a session as (local epoch-ms timestamps, averages) arrays."""
+    rows, averages = pb_rows(session, n)
+    return session.local_timestamps[rows], averages
+
 def create_avg_dict(session, n):
     """Create a dictionary of aoN averages with timestamps, using proper trimming."""
-    averages = {}
-    for i in range(len(session.solves) - n + 1):
-        solves = session.solves[i:i + n]
-        when = solves[-1].date
-        times = [s.time for s in solves]
-        try:
-            avg = compute_trimmed_average(times, n)
-            averages[when] = avg
-        except ValueError:
-            continue
-    return averages
+    return series_dict(*avg_arrays(session, n))
+
+def progression_arrays(session, ns):
+    """aoN and aoN PB series for every n in ns, from a single pass over the session.
+
+    Returns:
+        dict: n -> (local epoch-ms timestamps, averages, PB timestamps, PB averages),
+        with averages in seconds and windows without an average skipped.
+    """
+    values = ra.effective_ms(session.times_ms, session.penalties)
+    ns = [n for n in ns if 2 * ra.trim_count(n) < n]
+    when = session.local_timestamps
+    progressions = {}
+    for n, (averages, pbs) in ra.scan_averages(values, ns).items():
+        rows = np.flatnonzero(~np.isnan(averages))
+        pb_rows = np.array([row for row, _ in pbs], dtype=np.int64)
+        pb_values = np.array([avg for _, avg in pbs], dtype=np.float64)
+        progressions[n] = (when[rows], averages[rows], when[pb_rows], pb_values)
+    return progressions
+
+def series_dict(when, values):
+    """A series as a dict keyed by local date string, the shape the charts take."""
+    return dict(zip(tzs.format_local_array(when).tolist(), values.tolist()))
+
+def percentile_band_arrays(session, n=200, quantiles=(0.1, 0.5, 0.9)):
+    """Rolling quantiles over the last n solves.
+
+    Returns:
+        tuple: (local epoch-ms timestamps of the last solve of each window,
+        (windows, len(quantiles)) array in seconds, inf where a band falls on DNFs).
+    """
+    engine = ra.RollingQuantiles(n, quantiles)
+    values = ra.effective_ms(session.times_ms, session.penalties).tolist()
+    bands = [engine.push(value) for value in values][n - 1:]
+    when = session.local_timestamps[n - 1:] if len(values) >= n else session.local_timestamps[:0]
+    return when, np.array(bands, dtype=np.float64).reshape(len(bands), len(quantiles))
+
+def create_percentile_bands(session, n=200, quantiles=(0.1, 0.5, 0.9)):
+    """Rolling quantile bands over the last n solves, as parallel arrays.
+
+    Returns:
+        dict: "dates" of the last solve of each window and one list per quantile
+        (keyed "p10", "p50", ...), with None where a band falls on DNFs.
+    """
+    when, bands = percentile_band_arrays(session, n, quantiles)
+    return bands_dict(n, when, bands, quantiles)
+
+def bands_dict(n, when, bands, quantiles=(0.1, 0.5, 0.9), columnar=False):
+    """Percentile band arrays in the shape of create_percentile_bands, or with
+    "timestamps" and one array per quantile if columnar."""
+    if columnar:
+        result = {"window": n, "timestamps": when}
+    else:
+        result = {"window": n, "dates": tzs.format_local_array(when).tolist()}
+    for i, q in enumerate(quantiles):
+        if columnar:
+            result[f"p{round(q * 100)}"] = bands[:, i]
+        else:
+            result[f"p{round(q * 100)}"] = [band if band != float('inf') else None for band in bands[:, i].tolist()]
+    return result
 
 def create_single_dict(session):
     """Create a dictionary of single solve times with timestamps."""
-    return {solve.date: solve.time for solve in session.solves}
+    dates = tzs.format_local_array(session.local_timestamps).tolist()
+    return dict(zip(dates, session.times.tolist()))
 
 def create_single_pb_dict(session):
     """Create a dictionary of single solve PBs with timestamps."""
-    solves = session.solves
     best_time = float('inf')
     pb_dict = {}
-    for s in solves:
-        if s.time < best_time:
-            best_time = s.time
-            pb_dict[s.date] = s.time
+    for when, time in zip(session.local_timestamps.tolist(), session.times.tolist()):
+        if time < best_time:
+            best_time = time
+            pb_dict[tzs.format_local(when)] = time
     return pb_dict
 
 def create_pb_dict(session, n):
     """Create a dictionary of personal best aoN averages with timestamps."""
-    if n == 5:
-        pbs = pb_checker.ao5PBs([session])
-    elif n == 12:
-        pbs = pb_checker.ao12PBs([session])
-    elif n == 100:
-        pbs = pb_checker.ao100PBs([session])
-    else:
-        raise ValueError("Unsupported average length for PBs.")
-
-    return {pb[0][-1].date: pb[1] for pb in pbs}
+    return series_dict(*pb_arrays(session, n))
 
 def most_improved(sessions):
     improvement_dict = {}
     for session in sessions:
-        if(len(session.solves) > 100):
-            first100times = [i.time for i in session.solves[:100]]
-            last100times = [i.time for i in session.solves[-100:]]
+        if(len(session) > 100):
+            first100times = session.times[:100].tolist()
+            last100times = session.times[-100:].tolist()
             improvement_dict[session.name] = {
                 "firstao100": compute_trimmed_average(first100times, 100),
                 "lastao100": compute_trimmed_average(last100times, 100),
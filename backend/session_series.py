@@ -0,0 +1,51 @@
+import numpy as np
+import utils.preprocess_solves as pf
+import plot_improvement
+from utils.series_pyramid import SeriesPyramid
+
+# Chart series that can be zoomed with /series. Ranges are chosen in UTC epoch ms,
+# like /best-in-range/; buckets report local epoch ms, the chart's time axis.
+SERIES = ("single", "ao5", "ao12", "ao100", "pb_single", "pb_ao5", "pb_ao12", "pb_ao100")
+
+def series_rows(session, name):
+    """(session rows, values in seconds) of one of SERIES."""
+    if name not in SERIES:
+        raise ValueError(f"Unknown series: {name}")
+    pb = name.startswith("pb_")
+    kind = name[3:] if pb else name
+    if kind == "single":
+        rows, values = np.arange(len(session.times)), session.times
+        if pb:
+            previous_best = np.minimum.accumulate(np.concatenate(([np.inf], values[:-1])))
+            rows = np.flatnonzero(values < previous_best)
+            values = values[rows]
+        return rows, values
+    n = int(kind[2:])
+    return plot_improvement.pb_rows(session, n) if pb else plot_improvement.avg_rows(session, n)
+
+def series_pyramid(session, name):
+    """Pyramid of one of SERIES, built on the first query and kept with the session."""
+    key = ("series", name)
+    if key not in session.derived:
+        rows, values = series_rows(session, name)
+        session.derived[key] = SeriesPyramid(
+            session.local_timestamps[rows], values, search_times=session.timestamps[rows]
+        )
+    return session.derived[key]
+
+def session_series(session, name, t0=None, t1=None, resolution=1000):
+    """One series of a session between two UTC epoch-ms instants (inclusive; the
+    whole session if omitted), as at most `resolution` min/max/mean buckets.
+
+    See SeriesPyramid.query for the returned arrays.
+    """
+    pyramid = series_pyramid(session, name)
+    t0 = np.iinfo(np.int64).min if t0 is None else t0
+    t1 = np.iinfo(np.int64).max if t1 is None else t1
+    return {"series": name, **pyramid.query(t0, t1, resolution)}
+
+if __name__ == "__main__":
+    session = pf.load_all_sessions("data/suku.txt")[0]
+    for name in SERIES:
+        result = session_series(session, name, resolution=8)
+        print(name, series_pyramid(session, name), result["level"], result["mean"].round(2))
@@ -1,53 +1,57 @@
+import numpy as np
 import utils.preprocess_solves as pf
 
-def percentile(solve, cubing_period):
-    """ Returns the percentile of the solve in the list of all solves. """
-    solve_time = solve.time
-    solve_list = []
-    for i in cubing_period.solves:
-        solve_list.append(i.time)
-
-    solve_list.sort()
-    if solve_time in solve_list:
-        index = solve_list.index(solve_time)
-        percentile = (index + 1) / len(solve_list) * 100
-    else:
-        # If the solve time is not in the list, we can assume it's better than the worst solve
-        percentile = (len(solve_list) + 1) / len(solve_list) * 100
-
-    return percentile
-
 def solve_levels_from_sessions(cubing_sessions):
-    """Returns a 10-index list where each index is the average percentile of the corresponding 10% chunk across all cubing periods."""
-
-    # Initialize a list of 10 lists to hold chunk percentiles
-    cubing_periods = pf.load_all_cubing_periods(cubing_sessions)
-    chunk_percentiles = [[] for _ in range(10)]
+    """Returns a 10-index list where each index is the average percentile of the corresponding 10% chunk across all cubing periods.
 
-    for cubing_period in cubing_periods:
-        solves = cubing_period.solves
-        n = len(solves)
-        if n == 0:
+    Every solve is ranked within its period in one lexsort by (period, time); a
+    solve's percentile is (number of faster solves in the period + 1) / period
+    length * 100, and chunk averages come from bincount group-bys.
+    """
+    chunk_sums, chunk_counts = [], []
+    for session in cubing_sessions:
+        periods = session.periods()
+        if not periods:
             continue
-
-        # Determine chunk sizes (10 chunks)
-        for i in range(10):
-            start = i * n // 10
-            end = (i + 1) * n // 10 if i < 9 else n  # Ensure last chunk includes any remainder
-            chunk = solves[start:end]
-
-            if chunk:
-                avg = sum(percentile(solve, cubing_period) for solve in chunk) / len(chunk)
-                chunk_percentiles[i].append(avg)
+        starts = np.array([period.start for period in periods], dtype=np.int64)
+        lengths = np.array([len(period) for period in periods], dtype=np.int64)
+        times = session.times[starts[0]:starts[-1] + lengths[-1]]
+        period_ids = np.repeat(np.arange(len(periods)), lengths)
+        positions = np.arange(len(times)) - np.repeat(starts - starts[0], lengths)
+        period_lengths = lengths[period_ids]
+
+        # Rank within the period, with ties sharing the rank of their first occurrence
+        order = np.lexsort((times, period_ids))
+        sorted_ids, sorted_times = period_ids[order], times[order]
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = (sorted_ids[1:] != sorted_ids[:-1]) | (sorted_times[1:] != sorted_times[:-1])
+        group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(order)), 0))
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = group_start - (np.cumsum(np.concatenate(([0], lengths)))[:-1])[sorted_ids]
+        percentiles = (ranks + 1) / period_lengths * 100
+
+        # Chunk i of a period of n solves holds positions [i * n // 10, (i + 1) * n // 10)
+        chunks = -(-10 * (positions + 1) // period_lengths) - 1
+        keys = period_ids * 10 + chunks
+        sums = np.bincount(keys, weights=percentiles, minlength=10 * len(periods)).reshape(-1, 10)
+        counts = np.bincount(keys, minlength=10 * len(periods)).reshape(-1, 10)
+        chunk_sums.append(sums)
+        chunk_counts.append(counts)
+
+    if not chunk_sums:
+        return [0] * 10
+    sums = np.concatenate(chunk_sums)
+    counts = np.concatenate(chunk_counts)
+    present = counts > 0
+    averages = np.divide(sums, counts, out=np.zeros_like(sums), where=present)
 
     # Compute the final average percentile for each chunk across all periods
-    result = [
-        sum(chunk) / len(chunk) if chunk else 0  # Handle empty chunk cases
-        for chunk in chunk_percentiles
+    periods_with_chunk = present.sum(axis=0)
+    return [
+        float(averages[present[:, i], i].sum() / periods_with_chunk[i]) if periods_with_chunk[i] else 0
+        for i in range(10)
     ]
 
-    return result
-
 
 import matplotlib.pyplot as plt
 
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the backend modules the way they import each other (utils.xxx, pb_checker, ...)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
@@ -0,0 +1,30 @@
+import os
+import numpy as np
+import utils.preprocess_solves as pf
+import utils.rolling_average as ra
+import best_in_range
+from conftest import DATA_DIR
+
+def brute_force(session, n, t0, t1):
+    """Best single/aoN over every window of n consecutive solves all in [t0, t1]."""
+    values = session.times if n == 1 else ra.batch_averages(ra.effective_ms(session.times_ms, session.penalties), n)
+    windows = np.lib.stride_tricks.sliding_window_view(session.timestamps, n)
+    inside = ((windows >= t0) & (windows <= t1)).all(axis=1) & np.isfinite(values)
+    return float(values[inside].min()) if inside.any() else None
+
+def test_best_in_range_matches_brute_force():
+    sessions = pf.load_all_sessions(os.path.join(DATA_DIR, "real.txt"), "Asia/Kolkata")
+    unsorted = [s for s in sessions if not best_in_range.timestamps_sorted(s)]
+    ordered = [s for s in sessions if len(s) > 200 and best_in_range.timestamps_sorted(s)]
+    assert unsorted and ordered
+    rng = np.random.default_rng(0)
+    for session in unsorted[:2] + ordered[:1]:
+        # Random ranges, plus ranges that end around a solve recorded out of time order
+        ranges = [np.sort(rng.choice(session.timestamps, 2)) for _ in range(15)]
+        for row in np.flatnonzero(np.diff(session.timestamps) < 0)[:5]:
+            around = session.timestamps[max(row - 5, 0):row + 2]
+            ranges += [np.sort(rng.choice(around, 2)) for _ in range(10)]
+        for t0, t1 in ranges:
+            for n in (1, 5, 12):
+                best = best_in_range.best_in_range(session, n, int(t0), int(t1))
+                assert (best["value"] if best else None) == brute_force(session, n, t0, t1)
@@ -0,0 +1,60 @@
+import io
+import json
+import os
+import numpy as np
+import utils.export_reader as er
+import utils.preprocess_solves as pf
+from conftest import DATA_DIR
+
+EXPORT = os.path.join(DATA_DIR, "real.txt")
+
+# Edge cases the real export lacks: an empty session, escaped quotes and non-ASCII
+# text in strings, a key that looks like a session but is not an array, odd spacing
+EDGE_CASES = """ {
+  "session1" : [ [[0,9512],"R U R' \\"F\\"","née \\u00e9 ✓",1700000000] ,[[-1,0],"","",1700000060]],
+  "session2":[],
+  "session10":[[[2000,123456789],"D2","",1700000120]],
+  "session3":"not a session",
+  "properties":{"sessionData":"{\\"1\\":{\\"name\\":\\"3x3\\"}}","x":[1,2.5e3,null]}
+}
+"""
+
+def expected_solves(data):
+    return [
+        (int(key[len("session"):]), solve)
+        for key, value in data.items() if key.startswith("session") and isinstance(value, list)
+        for solve in value
+    ]
+
+def streamed(text, chunk_size):
+    solves = []
+    other = er.stream_export(io.StringIO(text), lambda session_id, solve: solves.append((session_id, solve)), chunk_size)
+    return solves, other
+
+def test_stream_export_matches_json_load():
+    with open(EXPORT, encoding="utf-8") as f:
+        text = f.read()
+    data = json.loads(text)
+    # Chunks small enough that solves, strings and numbers straddle their edges
+    for chunk_size in (7, 4096, er.CHUNK_SIZE):
+        solves, other = streamed(text, chunk_size)
+        assert solves == expected_solves(data)
+        assert other == {"properties": data["properties"]}
+
+def test_stream_export_edge_cases():
+    data = json.loads(EDGE_CASES)
+    for chunk_size in range(1, 40):
+        solves, other = streamed(EDGE_CASES, chunk_size)
+        assert solves == expected_solves(data)
+        assert other == {"session3": "not a session", "properties": data["properties"]}
+
+def test_stream_export_empty():
+    assert streamed("{}", 1) == ([], {})
+
+def test_parallel_read_matches_stream():
+    sessions = pf.load_all_sessions(EXPORT)
+    for _ in range(2):  # the second upload reuses the pool
+        parallel = pf.load_all_sessions(EXPORT, workers=2)
+        assert [(s.name, s.start, s.stop) for s in parallel] == [(s.name, s.start, s.stop) for s in sessions]
+        assert np.array_equal(parallel[0].table.times, sessions[0].table.times)
+        assert list(parallel[0].table.comments) == list(sessions[0].table.comments)
@@ -0,0 +1,87 @@
+import os
+import numpy as np
+import utils.preprocess_solves as pf
+import utils.rolling_average as ra
+import utils.solve_table as st
+import pb_checker
+import pbs_per_day
+from plot_improvement import compute_trimmed_average
+from conftest import DATA_DIR
+
+def make_session(solves):
+    """A one-session table from (seconds, raw csTimer penalty) pairs, one solve a minute."""
+    builder = st.SolveTableBuilder()
+    for i, (seconds, penalty) in enumerate(solves):
+        builder.add_raw_solve(1, [[penalty, round(seconds * 1000)], "", "", 1700000000 + 60 * i])
+    table = builder.build()
+    table.set_session_events({1: "333"})
+    return pf.Session("test", 1, "333", table, 0, len(table))
+
+def pbs(session, kind, n):
+    events, _ = pb_checker.session_pb_events(session, types=((kind, n),))
+    return list(zip(events['row'].tolist(), events['value'].round(4).tolist()))
+
+def test_single_pbs_are_strict_and_count_plus_two():
+    session = make_session([(10, 0), (10, 0), (8.5, 2000), (9.8, 0), (9, -1), (9.8, 0), (9.7, 0)])
+    # Ties (rows 1 and 5) are not PBs, row 2 is 10.5 with its +2 and a DNF never is
+    assert pbs(session, pb_checker.PB_SINGLE, 1) == [(0, 10.0), (3, 9.8), (6, 9.7)]
+
+def test_mean_with_a_dnf_is_a_dnf():
+    session = make_session([(12, 0), (11, 0), (10, 0), (1, -1), (9, 0), (9, 0), (9, 0)])
+    assert pbs(session, pb_checker.PB_MEAN, 3) == [(2, 11.0), (6, 9.0)]
+
+def test_average_is_dnf_once_more_solves_are_dnf_than_trimmed():
+    solves = [(10, 0), (11, 0), (12, 0), (13, 0), (1, -1), (5, -1), (9, 0), (9, 0), (9, 0), (9, 0)]
+    session = make_session(solves)
+    # Row 4: one DNF is trimmed, so (11 + 12 + 13) / 3 is the first ao5. Rows 5-8
+    # hold two DNFs and are DNF averages; row 9 has one DNF again
+    assert pbs(session, pb_checker.PB_AVERAGE, 5) == [(4, 12.0), (9, 9.0)]
+
+def naive_pb_rows(values, kind, n):
+    """PB rows from integer ms (DNF as inf), so equal averages compare equal."""
+    if kind == pb_checker.PB_SINGLE:
+        series = list(values)
+    else:
+        series = [float('inf')] * (n - 1)
+        for i in range(n - 1, len(values)):
+            window = values[i - n + 1:i + 1]
+            series.append(sum(window) / n if kind == pb_checker.PB_MEAN else compute_trimmed_average(window, n))
+    rows, best = [], float('inf')
+    for row, value in enumerate(series):
+        if value < best:
+            rows.append(row)
+            best = value
+    return rows
+
+def test_pb_events_match_naive_scan():
+    sessions = pf.load_all_sessions(os.path.join(DATA_DIR, "real.txt"))
+    for session in sorted(sessions, key=len)[-3:]:
+        events, _ = pb_checker.session_pb_events(session)
+        values = [
+            float('inf') if value == ra.DNF_MS else value
+            for value in ra.effective_ms(session.times_ms, session.penalties).tolist()
+        ]
+        for kind, n in pb_checker.PB_TYPES:
+            selected = events[(events['kind'] == kind) & (events['n'] == n)]
+            assert selected['row'].tolist() == naive_pb_rows(values, kind, n), (session.name, kind, n)
+
+def test_resumed_scan_matches_full_scan():
+    session = max(pf.load_all_sessions(os.path.join(DATA_DIR, "real.txt")), key=len)
+    full, full_bests = pb_checker.session_pb_events(session)
+    split = len(session) // 2
+    prefix = pf.Session(session.name, session.id, session.scramble_event, session.table, session.start, session.start + split)
+    head, bests = pb_checker.session_pb_events(prefix)
+    tail, tail_bests = pb_checker.session_pb_events(session, start=split, bests=bests)
+    assert np.array_equal(np.concatenate((head, tail)), full)
+    assert tail_bests == full_bests
+
+def test_pb_counts_group_the_event_stream():
+    sessions = pf.load_all_sessions(os.path.join(DATA_DIR, "real.txt"), "Asia/Kolkata")
+    events = pb_checker.pb_events(sessions, pbs_per_day.COUNTED_TYPES)
+    per_day = pbs_per_day.pbs_per_day(events)
+    per_month = pbs_per_day.pbs_per_month(events)
+    per_event = pbs_per_day.pbs_per_event(events, sessions[0].table.events)
+    assert sum(per_day.values()) == sum(per_month.values()) == sum(per_event.values()) == len(events)
+    for month, count in per_month.items():
+        assert count == sum(n for day, n in per_day.items() if day.startswith(month))
+    assert set(per_event) <= {session.scramble_event for session in sessions} | {"Unknown"}
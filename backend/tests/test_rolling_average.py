@@ -0,0 +1,64 @@
+import os
+import numpy as np
+import utils.preprocess_solves as pf
+import utils.rolling_average as ra
+import utils.solve_table as st
+from plot_improvement import compute_trimmed_average
+from conftest import DATA_DIR
+
+NS = (5, 12, 50, 100)
+
+def naive_averages(seconds, n):
+    return np.array([compute_trimmed_average(seconds[i:i + n].tolist(), n) for i in range(len(seconds) - n + 1)])
+
+def synthetic(count=3000, seed=0):
+    """Solve times with many DNFs and +2s, so DNFs land inside the trimmed middle."""
+    rng = np.random.default_rng(seed)
+    times_ms = rng.integers(8000, 20000, count).astype(np.int32)
+    penalties = rng.choice([st.PENALTY_NONE, st.PENALTY_PLUS2, st.PENALTY_DNF], count, p=[0.8, 0.1, 0.1]).astype(np.int8)
+    return times_ms, penalties
+
+def cases():
+    sessions = pf.load_all_sessions(os.path.join(DATA_DIR, "real.txt"))
+    yield from ((s.times_ms, s.penalties) for s in sorted(sessions, key=len)[-2:])
+    yield synthetic()
+
+def test_engines_match_naive_average():
+    for times_ms, penalties in cases():
+        values = ra.effective_ms(times_ms, penalties)
+        seconds = np.where(values == ra.DNF_MS, np.inf, values / 1000)
+        scans = ra.scan_averages(values, NS)
+        for n in NS:
+            expected = naive_averages(seconds, n)
+            np.testing.assert_allclose(ra.batch_averages(values, n), expected)
+            np.testing.assert_allclose(ra.batch_averages(values, n, chunk_bytes=1000), expected)
+            np.testing.assert_allclose(scans[n][0][n - 1:], expected)
+            assert np.isnan(scans[n][0][:n - 1]).all()
+
+def test_invalid_solves_void_their_windows():
+    times_ms, penalties = synthetic(1000, seed=1)
+    values = ra.effective_ms(times_ms, penalties)
+    seconds = np.where(values == ra.DNF_MS, np.inf, values / 1000)
+    valid = np.random.default_rng(2).random(len(values)) > 0.01
+    for n in (5, 12):
+        expected = naive_averages(seconds, n)
+        expected[[not valid[i:i + n].all() for i in range(len(expected))]] = np.nan
+        np.testing.assert_allclose(ra.batch_averages(values, n, valid), expected)
+        engine = ra.RollingTrimmedAverage(n)
+        pushed = [engine.push(value, ok) for value, ok in zip(values.tolist(), valid.tolist())][n - 1:]
+        np.testing.assert_allclose(np.array(pushed, dtype=np.float64), expected)
+
+def test_rolling_quantiles_match_np_quantile():
+    times_ms, penalties = synthetic(2000, seed=3)
+    values = ra.effective_ms(times_ms, penalties)
+    seconds = np.where(values == ra.DNF_MS, np.inf, values / 1000)
+    quantiles = (0.1, 0.5, 0.9)
+    for n in (1, 7, 200):
+        engine = ra.RollingQuantiles(n, quantiles)
+        pushed = [engine.push(value) for value in values.tolist()]
+        assert all(bands is None for bands in pushed[:n - 1])
+        # A large finite DNF, as np.quantile turns inf * 0 into NaN
+        windows = np.lib.stride_tricks.sliding_window_view(np.minimum(seconds, 1e12), n)
+        expected = np.quantile(windows, quantiles, axis=1).T
+        expected[expected > 1e6] = np.inf
+        np.testing.assert_allclose(np.array(pushed[n - 1:]), expected)
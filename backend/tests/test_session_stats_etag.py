@@ -0,0 +1,57 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+import main
+from utils.result_cache import etag_matches
+from conftest import DATA_DIR
+
+EXPORT = os.path.join(DATA_DIR, "real.txt")
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Uploads and parsed snapshots are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return TestClient(main.app)
+
+def upload(client, timezone="Asia/Kolkata"):
+    with open(EXPORT, "rb") as f:
+        response = client.post("/upload-solves/", files={"file": ("real.txt", f)}, data={"timezone": timezone})
+    assert response.status_code == 200
+    return response.json()["dataset_id"]
+
+def stats(client, dataset_id, session_index=0, **headers):
+    return client.get("/session-stats/", params={"dataset_id": dataset_id, "session_index": session_index}, headers=headers)
+
+def test_session_stats_revalidates_with_etag(client):
+    dataset_id = upload(client)
+    first = stats(client, dataset_id)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.json()
+
+    again = stats(client, dataset_id, **{"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+    assert stats(client, dataset_id, **{"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+
+    # The same file uploaded again has the same ETags under a new dataset id
+    assert stats(client, upload(client), **{"If-None-Match": etag}).status_code == 304
+
+def test_session_stats_etag_varies_with_request(client):
+    dataset_id = upload(client)
+    etag = stats(client, dataset_id).headers["etag"]
+    others = [
+        stats(client, dataset_id, session_index=1),
+        stats(client, upload(client, "UTC")),
+        stats(client, dataset_id, Accept="application/vnd.cstimer.columnar+json"),
+    ]
+    for response in others:
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    assert stats(client, dataset_id, **{"If-None-Match": '"stale"'}).status_code == 200
+
+def test_etag_matches():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
@@ -0,0 +1,49 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pytz
+import utils.preprocess_solves as pf
+import utils.timezones as tzs
+import plot_improvement
+from conftest import DATA_DIR
+
+def test_format_local_array_empty():
+    assert len(tzs.format_local_array(np.zeros(0, dtype=np.int64))) == 0
+
+def test_format_local_array():
+    # 2024-03-10 02:30:05 as local epoch ms
+    assert tzs.format_local_array(np.array([1710037805000])).tolist() == ["2024-03-10 02:30:05"]
+
+def test_avg_dict_of_short_sessions():
+    sessions = pf.load_all_sessions(os.path.join(DATA_DIR, "real.txt"))
+    short = [session for session in sessions if len(session) < 100]
+    assert any(len(session) for session in short) and any(not len(session) for session in short)
+    for session in short:
+        assert plot_improvement.create_avg_dict(session, 100) == {}
+
+def pytz_local_ms(timestamps, timezone_str):
+    tz = pytz.timezone(timezone_str)
+    epoch = datetime(1970, 1, 1)
+    return np.array([
+        (datetime.fromtimestamp(ts / 1000, tz).replace(tzinfo=None) - epoch) // timedelta(milliseconds=1)
+        for ts in timestamps.tolist()
+    ], dtype=np.int64)
+
+def test_local_timestamps_across_dst():
+    # Spring forward and fall back in both hemispheres, and a 30-minute DST shift
+    changes = {
+        "America/New_York": ("2024-03-10 07:00:00", "2024-11-03 06:00:00"),
+        "Europe/London": ("2024-03-31 01:00:00", "2024-10-27 01:00:00"),
+        "Australia/Sydney": ("2024-04-06 16:00:00", "2024-10-05 16:00:00"),
+        "Australia/Lord_Howe": ("2024-04-06 15:00:00", "2024-10-05 15:30:00"),
+    }
+    for timezone_str, instants in changes.items():
+        for instant in instants:
+            change = int(np.datetime64(instant, "ms").astype(np.int64))
+            # every 7 minutes over two days, plus the milliseconds next to the change
+            timestamps = np.concatenate((
+                np.arange(change - tzs.DAY_MS, change + tzs.DAY_MS, 7 * 60 * 1000),
+                change + np.array([-1000, -1, 0, 1, 1000]),
+            ))
+            expected = pytz_local_ms(timestamps, timezone_str)
+            assert np.array_equal(tzs.local_timestamps(timestamps, timezone_str), expected), (timezone_str, instant)
@@ -0,0 +1,30 @@
+import os
+import numpy as np
+import utils.upload_cache as uc
+from conftest import DATA_DIR
+
+EXPORT = os.path.join(DATA_DIR, "real.txt")
+
+def test_snapshot_round_trip(tmp_path):
+    content_hash = uc.hash_file(EXPORT)
+    parsed = uc.cached_load_all_sessions(EXPORT, content_hash, cache_dir=str(tmp_path))
+    cached = uc.cached_load_all_sessions(EXPORT, content_hash, cache_dir=str(tmp_path))
+    assert isinstance(cached[0].table.timestamps, np.memmap)
+    assert [s.name for s in cached] == [s.name for s in parsed]
+    assert np.array_equal(cached[0].table.times, parsed[0].table.times)
+
+def test_snapshot_evicted_while_loading(tmp_path, monkeypatch):
+    content_hash = uc.hash_file(EXPORT)
+    parsed = uc.cached_load_all_sessions(EXPORT, content_hash, cache_dir=str(tmp_path))
+    directory = os.path.join(str(tmp_path), content_hash)
+    load = np.load
+
+    def load_after_eviction(path, *args, **kwargs):
+        # meta.json was read, then another upload evicted the snapshot
+        uc.shutil.rmtree(directory, ignore_errors=True)
+        return load(path, *args, **kwargs)
+
+    monkeypatch.setattr(uc.np, "load", load_after_eviction)
+    sessions = uc.cached_load_all_sessions(EXPORT, content_hash, cache_dir=str(tmp_path))
+    monkeypatch.undo()
+    assert [len(s) for s in sessions] == [len(s) for s in parsed]
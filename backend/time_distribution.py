@@ -1,21 +1,12 @@
 import utils.preprocess_solves as pf
-import math
+import numpy as np
 
 def time_distribution(session):
-    time_dict = {}
-    dnf_count = 0
-    for solve in session.solves:
-        
-        if solve.time != float('inf'):
-            time = math.floor(solve.time)
-        else:
-            dnf_count += 1
-            continue
-        if time not in time_dict:
-            time_dict[time] = 1
-        else:
-            time_dict[time] += 1
-    time_dict = dict(sorted(time_dict.items(), key=lambda item: item[0]))
+    times = session.times
+    finite = np.isfinite(times)
+    dnf_count = int(len(times) - finite.sum())
+    seconds, counts = np.unique(np.floor(times[finite]).astype(np.int64), return_counts=True)
+    time_dict = {int(second): int(count) for second, count in zip(seconds, counts)}
     time_dict["DNF"] = dnf_count
     return time_dict 
 
@@ -1,4 +1,5 @@
 import utils.preprocess_solves as pf 
+import numpy as np
 
 def time_spent_breakup(sessions):
     """Calculate the total time spent on solves for each event in the provided sessions.
@@ -8,11 +9,9 @@ def time_spent_breakup(sessions):
 
     total_solves = 0
     for session in sessions:
-        total_solves += len(session.solves)
-        local_total = 0
-        for solve in session.solves:
-            if(solve.time != float('inf')):
-                local_total += (solve.time/3600)
+        total_solves += len(session)
+        times = session.times
+        local_total = float(times[np.isfinite(times)].sum()) / 3600
         if session.scramble_event not in event_times:
             event_times[session.scramble_event] = 0
         event_times[session.scramble_event] += local_total
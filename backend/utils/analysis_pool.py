@@ -0,0 +1,50 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+class PoolBusy(Exception):
+    """Raised when an AnalysisPool already holds as many jobs as it accepts."""
+
+class AnalysisPool:
+    """Runs blocking analysis off the asyncio event loop, with a bounded backlog.
+
+    At most `workers` jobs run at once and at most `max_pending` are accepted in
+    total (running plus waiting); past that, run() raises PoolBusy straight away
+    instead of queueing, so callers can answer 503 while the loop stays free.
+    """
+
+    def __init__(self, workers=2, max_pending=8):
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+
+    def __str__(self):
+        return f"AnalysisPool: {self.pending}/{self.max_pending} jobs, {self.workers} workers"
+
+    def __repr__(self):
+        return str(self)
+
+    def submit(self, fn, *args, **kwargs):
+        """Start fn(*args, **kwargs) on a worker thread and return an asyncio future for it.
+
+        Must be called from the event loop; raises PoolBusy if the pool is full.
+        """
+        # Only the event loop thread touches `pending`, so no lock is needed
+        if self.pending >= self.max_pending:
+            raise PoolBusy()
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        self.pending -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a worker thread and await its result."""
+        return await self.submit(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
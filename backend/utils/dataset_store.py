@@ -0,0 +1,87 @@
+from collections import OrderedDict
+import secrets
+import threading
+
+class Dataset:
+    """An uploaded export: its sessions plus the global stats computed for them.
+
+    A Dataset is never modified after it is stored; a re-upload builds a new one.
+    `stats` computes and memoizes the global stats on demand (global_stats.StatsCache).
+    `nbytes` grows as analyses cache what they derive from the sessions.
+    """
+
+    def __init__(self, sessions, stats, content_hash=None):
+        self.id = secrets.token_urlsafe(16)
+        self.sessions = sessions
+        self.stats = stats
+        self.content_hash = content_hash
+
+    @property
+    def nbytes(self):
+        """Bytes of the solve table, the caches derived from it and its sessions, and the stats."""
+        derived = sum(session.derived_nbytes for session in self.sessions)
+        if self.sessions:
+            table = self.sessions[0].table
+            derived += table.nbytes + table.derived_nbytes
+        return derived + self.stats.nbytes
+
+    def __str__(self):
+        return f"Dataset: {self.id}, {len(self.sessions)} sessions, {self.nbytes / 1e6:.2f} MB"
+
+    def __repr__(self):
+        return str(self)
+
+class DatasetStore:
+    """Thread-safe LRU of Datasets bounded by count and by total bytes.
+
+    Datasets grow as they are analysed, so the byte budget is checked against
+    their current size on every put and trim. The most recently used dataset is
+    always kept, even if it alone exceeds the budget.
+    """
+
+    def __init__(self, max_datasets=16, max_bytes=1024 * 1024 * 1024):
+        self.max_datasets = max_datasets
+        self.max_bytes = max_bytes
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._datasets)
+
+    def __str__(self):
+        return f"DatasetStore: {len(self)} datasets, {self.nbytes / 1e6:.2f} MB"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(dataset.nbytes for dataset in self._datasets.values())
+
+    def _trim(self):
+        sizes = OrderedDict((dataset_id, dataset.nbytes) for dataset_id, dataset in self._datasets.items())
+        total = sum(sizes.values())
+        while len(self._datasets) > 1 and (len(self._datasets) > self.max_datasets or total > self.max_bytes):
+            evicted_id, _ = self._datasets.popitem(last=False)
+            total -= sizes[evicted_id]
+
+    def put(self, dataset):
+        """Store a dataset, evicting the least recently used ones over budget. Returns its id."""
+        with self._lock:
+            self._datasets[dataset.id] = dataset
+            self._trim()
+        return dataset.id
+
+    def trim(self):
+        """Evict the least recently used datasets until the rest, as they are now, fit the budget."""
+        with self._lock:
+            self._trim()
+
+    def get(self, dataset_id):
+        """The dataset with this id (marking it recently used), or None if unknown or evicted."""
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+            return dataset
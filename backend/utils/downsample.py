@@ -0,0 +1,66 @@
+import numpy as np
+
+# Shape-preserving downsampling of a chart series to at most max_points points.
+# Both methods return the indices of the points to keep, in order, so parallel
+# arrays (timestamps, several bands) can be cut down the same way.
+
+def lttb(x, y, max_points):
+    """Largest-Triangle-Three-Buckets: the first and last points, plus from each of
+    max_points - 2 equal buckets the point forming the largest triangle with the
+    point kept before it and the mean of the next bucket.
+
+    Non-finite values (DNFs) are treated as the largest finite value when choosing.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1][:max_points], dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(y)
+    if not finite.all():
+        y = np.where(finite, y, y[finite].max() if finite.any() else 0.0)
+
+    # Bucket i covers [edges[i], edges[i + 1]); every bucket holds at least one point
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes, y[-1])
+
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xa, ya = x[a], y[a]
+        area = np.abs((xa - mean_x[i + 1]) * (y[lo:hi] - ya) - (xa - x[lo:hi]) * (mean_y[i + 1] - ya))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def min_max(x, y, max_points):
+    """The smallest and largest point of each of max_points // 2 equal buckets, so
+    every spike (a DNF or a PB) survives. Linear time; y must not contain NaN."""
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    buckets = max(max_points // 2, 1)
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    ids = np.repeat(np.arange(buckets), np.diff(np.append(starts, n)))
+    picks = []
+    for extreme in (np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)):
+        rows = np.flatnonzero(y == extreme[ids])
+        # the first matching row of each bucket
+        first = np.concatenate(([True], ids[rows][1:] != ids[rows][:-1]))
+        picks.append(rows[first])
+    return np.union1d(*picks)
+
+METHODS = {"lttb": lttb, "minmax": min_max}
+
+def downsample(x, y, max_points, method="lttb"):
+    """Indices of at most max_points points of (x, y) chosen by one of METHODS."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return METHODS[method](x, y, max_points)
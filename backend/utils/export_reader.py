@@ -0,0 +1,220 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import io
+import json
+import mmap
+import multiprocessing
+import re
+import threading
+import utils.solve_table as st
+
+CHUNK_SIZE = 1 << 20  # characters read from the file at a time
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_SESSION_KEY = re.compile(r'session(\d+)')
+# Quotes inside JSON strings are always escaped, so an unescaped `"sessionN":[` or
+# `"properties":` after `{` or `,` can only be a key of the top-level object.
+_TOP_LEVEL_KEY = re.compile(rb'[{,]\s*"(session(\d+)|properties)"\s*:\s*')
+_decoder = json.JSONDecoder()
+
+# Parse workers are started by a fork server rather than forked from the server
+# process, whose other threads may hold locks a forked child would inherit; one
+# pool is kept for the life of the process instead of one per upload
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def parse_pool(workers):
+    """The shared process pool for parallel_read_export, (re)created with `workers` processes if needed."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers or getattr(_pool, "_broken", False):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(_START_METHOD))
+            _pool_workers = workers
+        return _pool
+
+class _StreamBuffer:
+    """A sliding window over a text file that decodes one JSON value at a time."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read another chunk, dropping the consumed prefix. Returns False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at end of file)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed csTimer export: expected {char!r}, found {self.peek()!r}.")
+        self.pos += 1
+
+    def accept(self, char):
+        """Consume `char` if it is the next character."""
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def decode(self):
+        """Decode the next complete JSON value, reading more input until it fits in the buffer."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number that ends exactly at the buffer edge may continue in the next chunk
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+def _stream_array(stream, on_item):
+    """Decode the elements of a JSON array one by one."""
+    stream.expect('[')
+    if stream.accept(']'):
+        return
+    while True:
+        on_item(stream.decode())
+        if not stream.accept(','):
+            break
+    stream.expect(']')
+
+def stream_export(f, on_solve, chunk_size=CHUNK_SIZE):
+    """Walk a csTimer export one solve at a time.
+
+    Calls on_solve(session_id, raw_solve) for every entry of every `sessionN` array,
+    so the nested list-of-lists for the whole file is never built.
+
+    Args:
+        f: Text file object positioned at the start of the export.
+        on_solve (callable): Receives the session number and the raw solve list.
+
+    Returns:
+        dict: The remaining top-level entries (normally just `properties`).
+    """
+    stream = _StreamBuffer(f, chunk_size)
+    other = {}
+    stream.expect('{')
+    if stream.accept('}'):
+        return other
+
+    while True:
+        key = stream.decode()
+        stream.expect(':')
+        match = _SESSION_KEY.fullmatch(key)
+        if match and stream.peek() == '[':
+            session_id = int(match.group(1))
+            _stream_array(stream, lambda raw_solve: on_solve(session_id, raw_solve))
+        else:
+            other[key] = stream.decode()
+        if not stream.accept(','):
+            break
+
+    stream.expect('}')
+    return other
+
+def find_session_spans(filepath):
+    """Locate the byte range of every `sessionN` array without parsing the solves.
+
+    Returns:
+        tuple: ([(session_id, start, end), ...] in file order, (start, end) of the
+        `properties` value or None).
+    """
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        keys = [(m.group(2), m.start(), m.end()) for m in _TOP_LEVEL_KEY.finditer(data)]
+        end_of_object = data.rfind(b'}')
+    spans = []
+    properties = None
+    for i, (session_id, _, value_start) in enumerate(keys):
+        value_end = keys[i + 1][1] if i + 1 < len(keys) else end_of_object
+        if session_id is None:
+            properties = (value_start, value_end)
+        else:
+            spans.append((int(session_id), value_start, value_end))
+    return spans, properties
+
+def _read_span(filepath, start, end):
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start).decode('utf-8')
+
+def _parse_spans(filepath, spans):
+    """Worker: parse a batch of session arrays into one SolveTable."""
+    builder = st.SolveTableBuilder()
+    for session_id, start, end in spans:
+        stream = _StreamBuffer(io.StringIO(_read_span(filepath, start, end)))
+        _stream_array(stream, lambda raw_solve: builder.add_raw_solve(session_id, raw_solve))
+        if stream.peek() != '':
+            raise ValueError(f"Malformed csTimer export: unexpected data after session{session_id}.")
+    return builder.build(), builder.session_ranges
+
+def _batch_spans(spans, batch_count):
+    """Group consecutive spans into batches of roughly equal byte size."""
+    total = sum(end - start for _, start, end in spans)
+    target = max(1, total // batch_count)
+    batches, current, size = [], [], 0
+    for span in spans:
+        current.append(span)
+        size += span[2] - span[1]
+        if size >= target:
+            batches.append(current)
+            current, size = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+def parallel_read_export(filepath, workers):
+    """Parse the sessions of an export across a process pool.
+
+    Returns:
+        tuple: (SolveTable of all solves in file order, {session_id: [start, stop]},
+        the remaining top-level entries).
+    """
+    spans, properties = find_session_spans(filepath)
+    other = {}
+    if properties is not None:
+        other['properties'] = json.loads(_read_span(filepath, *properties))
+
+    batches = _batch_spans(spans, workers * 4)
+    try:
+        results = list(parse_pool(workers).map(_parse_spans, [filepath] * len(batches), batches))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); the next call gets a fresh pool
+        results = list(parse_pool(workers).map(_parse_spans, [filepath] * len(batches), batches))
+
+    tables, session_ranges, offset = [], {}, 0
+    for table, ranges in results:
+        tables.append(table)
+        for session_id, (start, stop) in ranges.items():
+            session_ranges[session_id] = [start + offset, stop + offset]
+        offset += len(table)
+    if not tables:
+        tables = [st.SolveTableBuilder().build()]
+    return st.concat_tables(tables), session_ranges, other
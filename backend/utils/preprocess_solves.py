@@ -1,7 +1,12 @@
 import json
-from datetime import datetime
+import numpy as np
 import utils.scramble_codes as sc
-import pytz
+import utils.export_reader as er
+import utils.solve_table as st
+import utils.timezones as tzs
+
+PERIOD_GAP_MS = st.PERIOD_GAP_MS
+period_bounds = st.period_bounds
 
 class Solve:
     def __init__(self, time, date, scramble, penalty, comment):
@@ -18,90 +23,183 @@ class Solve:
         return str(self)
 
 class Session:
-    def __init__(self, name, session_id, scramble_event, solves, multiple_events=False):
+    """A csTimer session: a contiguous view of rows [start, stop) in a SolveTable."""
+    def __init__(self, name, session_id, scramble_event, table, start, stop, multiple_events=False):
         self.name = name
         self.id = session_id
         self.scramble_event = scramble_event
-        self.solves = solves
+        self.table = table
+        self.start = start
+        self.stop = stop
         self.multiple_events = multiple_events
+        self._solves = None
+        self._periods = {}
+        # Indexes and chart pyramids other modules build from the session, keyed by
+        # (module, parameter), so they are freed and counted with the dataset
+        self.derived = {}
+
+    def __len__(self):
+        return self.stop - self.start
 
     def __str__(self):
-        return f"Session: {self.name}, Solves: {len(self.solves)} for {self.scramble_event}, ID: {self.id}, Multiple Events: {self.multiple_events}"
+        return f"Session: {self.name}, Solves: {len(self)} for {self.scramble_event}, ID: {self.id}, Multiple Events: {self.multiple_events}"
 
     def __repr__(self):
         return str(self)
-    
+
+    @property
+    def derived_nbytes(self):
+        return sum(getattr(value, "nbytes", 0) for value in list(self.derived.values()))
+
+    @property
+    def timestamps(self):
+        return self.table.timestamps[self.start:self.stop]
+
+    @property
+    def times_ms(self):
+        return self.table.times_ms[self.start:self.stop]
+
+    @property
+    def penalties(self):
+        return self.table.penalties[self.start:self.stop]
+
+    @property
+    def times(self):
+        """Solve times in seconds (+2 applied, DNF as infinity)."""
+        return self.table.times[self.start:self.stop]
+
+    @property
+    def local_timestamps(self):
+        """Timestamps as local wall-clock epoch milliseconds."""
+        return self.table.local_timestamps[self.start:self.stop]
+
+    @property
+    def local_days(self):
+        return self.table.local_days[self.start:self.stop]
+
+    @property
+    def local_hours(self):
+        return self.table.local_hours[self.start:self.stop]
+
+    @property
+    def local_weekdays(self):
+        return self.table.local_weekdays[self.start:self.stop]
+
+    @property
+    def local_months(self):
+        return self.table.local_months[self.start:self.stop]
+
+    @property
+    def scrambles(self):
+        return self.table.scrambles[self.start:self.stop]
+
+    @property
+    def comments(self):
+        return self.table.comments[self.start:self.stop]
+
+    @property
+    def solves(self):
+        """Solve objects for this session, built on first access for code that still walks solves one by one."""
+        if self._solves is None:
+            dates = tzs.format_local_array(self.local_timestamps)
+            self._solves = [
+                Solve(
+                    time=float(self.times[i]),
+                    date=str(dates[i]),
+                    scramble=self.scrambles[i],
+                    penalty=st.raw_penalty(self.penalties[i]),
+                    comment=self.comments[i],
+                )
+                for i in range(len(self))
+            ]
+        return self._solves
+
+    def periods(self, gap_ms=PERIOD_GAP_MS):
+        """The session's cubing periods, cut from the table-wide period index and kept for reuse."""
+        if gap_ms not in self._periods:
+            starts, stops = self.table.period_bounds(gap_ms)
+            lo, hi = np.searchsorted(starts, [self.start, self.stop])
+            self._periods[gap_ms] = [
+                CubingPeriod(self, start - self.start, stop - self.start)
+                for start, stop in zip(starts[lo:hi].tolist(), stops[lo:hi].tolist())
+            ]
+        return self._periods[gap_ms]
+
 class CubingPeriod:
-    def __init__(self, session_name, scramble_event, solves, multiple_events=False):
-        self.session_name = session_name
-        self.scramble_event = scramble_event
-        self.solves = solves
-        self.multiple_events = multiple_events
+    """A run of solves with no gap over 20 minutes: rows [start, stop) of a session."""
+    def __init__(self, session, start, stop):
+        self.session = session
+        self.start = start
+        self.stop = stop
+        self.session_name = session.name
+        self.scramble_event = session.scramble_event
+        self.multiple_events = session.multiple_events
+
+    def __len__(self):
+        return self.stop - self.start
 
     def __str__(self):
-        return f"CubingPeriod: {self.session_name}, Solves: {len(self.solves)} for {self.scramble_event}, Multiple Events: {self.multiple_events} from {self.solves[0].date} to {self.solves[-1].date}"
+        return f"CubingPeriod: {self.session_name}, Solves: {len(self)} for {self.scramble_event}, Multiple Events: {self.multiple_events} from {self.start_date} to {self.end_date}"
 
     def __repr__(self):
         return str(self)
-    
+
+    @property
+    def timestamps(self):
+        return self.session.timestamps[self.start:self.stop]
+
+    @property
+    def local_timestamps(self):
+        return self.session.local_timestamps[self.start:self.stop]
+
+    @property
+    def times(self):
+        return self.session.times[self.start:self.stop]
+
+    @property
+    def solves(self):
+        return self.session.solves[self.start:self.stop]
+
+    @property
+    def local_day(self):
+        """Local calendar day the period started on (days since 1970-01-01)."""
+        return int(self.session.local_days[self.start])
+
+    @property
+    def local_month(self):
+        """Local calendar month the period started in (months since 1970-01)."""
+        return int(self.session.local_months[self.start])
+
+    @property
+    def start_date(self):
+        return tzs.format_local(self.local_timestamps[0])
+
+    @property
+    def end_date(self):
+        return tzs.format_local(self.local_timestamps[-1])
+
     def time_spent(self):
-        """Calculate the total time spent on solves in this cubing period."""
-        first_solve = datetime.strptime(self.solves[0].date, '%Y-%m-%d %H:%M:%S')
-        last_solve = datetime.strptime(self.solves[-1].date, '%Y-%m-%d %H:%M:%S')
-        return (last_solve - first_solve).total_seconds() / 60
+        """Calculate the total time spent on solves in this cubing period (in minutes)."""
+        timestamps = self.session.timestamps
+        return (int(timestamps[self.stop - 1]) - int(timestamps[self.start])) / 60000
 
 def unix_to_time(unix_time, timezone_str='UTC'):
-    tz = pytz.timezone(timezone_str)
-    return datetime.fromtimestamp(unix_time, tz).strftime('%Y-%m-%d %H:%M:%S')
-
-def create_solve(raw_solve, timezone_str='UTC'):
-    penalty = raw_solve[0][0]
-    time = raw_solve[0][1] / 1000  # ms to s
-    scramble = raw_solve[1]
-    comment = raw_solve[2]
-    date = unix_to_time(raw_solve[3], timezone_str)
-    if penalty == -1:
-        time = float('inf')  # Handle DNF as infinity
-    elif penalty == 2000:
-        time += 2  # Handle +2 penalty
-    return Solve(time, date, scramble, penalty, comment)
-
-
-def load_solves_for_session(data, session_key, timezone_str='UTC'):
-    solve_entries = data.get(session_key, [])
-    return [create_solve(s, timezone_str) for s in solve_entries]
-
-
-def get_cubing_periods(session):
-    """Partition sessions into cubing periods based on the assumption that a cubing period has solves within a 20 minute window."""
-    cubing_periods = []  
-    current_period = CubingPeriod(
-        session_name=session.name,
-        scramble_event=session.scramble_event,
-        solves=[],
-        multiple_events=session.multiple_events
-    )
-    for solve in session.solves:
-        if not current_period.solves:
-            current_period.solves.append(solve)
-            continue
-        
-        last_solve_time = datetime.strptime(current_period.solves[-1].date, '%Y-%m-%d %H:%M:%S')
-        current_solve_time = datetime.strptime(solve.date, '%Y-%m-%d %H:%M:%S')
-        
-        if (current_solve_time - last_solve_time).total_seconds() <= 1200:  # 20 minutes in seconds
-            current_period.solves.append(solve)
-        else:
-            cubing_periods.append(current_period)
-            current_period = CubingPeriod(
-                session_name=session.name,
-                scramble_event=session.scramble_event,
-                solves=[solve],
-                multiple_events=session.multiple_events
-            )
+    local_ms = tzs.local_timestamps(np.array([unix_time * 1000], dtype=np.int64), timezone_str)[0]
+    return tzs.format_local(local_ms)
 
+def get_cubing_periods(session, start=0, gap_ms=PERIOD_GAP_MS):
+    """Partition sessions into cubing periods based on the assumption that a cubing period has solves within a 20 minute window.
 
-    return cubing_periods
+    Args:
+        session (Session): Session to partition.
+        start (int): Only return periods starting at or after this row of the session,
+            e.g. the start of the last period seen before more solves were appended.
+        gap_ms (int): A longer gap between two solves ends a period.
+    """
+    periods = session.periods(gap_ms)
+    if start:
+        periods = [period for period in periods if period.start >= start]
+    return list(periods)
 
 def seconds_to_days_hours_minutes(seconds):
     """Convert seconds to days, hours, and minutes."""
@@ -112,38 +210,55 @@ def seconds_to_days_hours_minutes(seconds):
     minutes = seconds // 60
     return days, hours, minutes
 
-def load_all_sessions(filepath, timezone_str='UTC'):
-    with open(filepath, 'r') as f:
-        raw_data = json.load(f)
+def load_all_sessions(filepath, timezone_str='UTC', workers=1):
+    """Load a csTimer export into one SolveTable and return a Session view per session.
 
-    session_data = json.loads(raw_data['properties']['sessionData'])
-    sessions = []
+    Args:
+        filepath (str): Path of the csTimer export.
+        timezone_str (str): Timezone used for local dates.
+        workers (int): Parse sessions across this many processes when greater than 1;
+            otherwise the file is streamed in this process.
+    """
+    if workers > 1:
+        table, session_ranges, other = er.parallel_read_export(filepath, workers)
+    else:
+        builder = st.SolveTableBuilder()
+        with open(filepath, 'r') as f:
+            other = er.stream_export(f, builder.add_raw_solve)
+        table, session_ranges = builder.build(), builder.session_ranges
+    table.timezone_str = timezone_str
 
+    session_data = json.loads(other['properties']['sessionData'])
+    session_specs = []
     for session_id_str, metadata in session_data.items():
-        session_key = f"session{session_id_str}"
         name = str(metadata.get('name', f'Session {session_id_str}'))
-        scramble_event = metadata.get('opt', {}).get('scrType', '333')
-        solves = load_solves_for_session(raw_data, session_key, timezone_str)
-        session = Session(
-            name=f"Session {name}",
-            session_id=int(session_id_str),
-            scramble_event=sc.get_scramble_name(scramble_event),
-            solves=solves,
-            multiple_events=False
-        )
-        sessions.append(session)
+        scramble_event = sc.get_scramble_name(metadata.get('opt', {}).get('scrType', '333'))
+        session_specs.append((f"Session {name}", int(session_id_str), scramble_event))
+    table.set_session_events({session_id: event for _, session_id, event in session_specs})
 
+    sessions = []
+    for name, session_id, scramble_event in session_specs:
+        start, stop = session_ranges.get(session_id, (0, 0))
+        sessions.append(Session(
+            name=name,
+            session_id=session_id,
+            scramble_event=scramble_event,
+            table=table,
+            start=start,
+            stop=stop,
+            multiple_events=False
+        ))
     return sessions
 
 
-def load_all_cubing_periods(sessions):
+def load_all_cubing_periods(sessions, gap_ms=PERIOD_GAP_MS):
     """Load all cubing periods from the provided sessions."""
     cubing_periods = []
     #print(sessions)
     #print(sessions[0])
     for session in sessions:
         #print(session.name)
-        cubing_periods.extend(get_cubing_periods(session))
+        cubing_periods.extend(session.periods(gap_ms))
     return cubing_periods
 
 def seconds_to_days_hours_minutes(seconds):
@@ -0,0 +1,43 @@
+import numpy as np
+
+class SparseTable:
+    """Range-minimum index over a fixed array.
+
+    Level k holds the position of the minimum of every run of 2**k values, so
+    building costs O(n log n) and any [lo, hi) range is answered in O(1) by
+    comparing two overlapping runs. NaN is treated as +inf.
+    """
+
+    def __init__(self, values):
+        self.values = np.where(np.isnan(values), np.inf, values).astype(np.float64)
+        n = len(self.values)
+        levels = [np.arange(n, dtype=np.int64)]
+        span = 1
+        while 2 * span <= n:
+            prev = levels[-1]
+            left, right = prev[:n - 2 * span + 1], prev[span:n - span + 1]
+            levels.append(np.where(self.values[right] < self.values[left], right, left))
+            span *= 2
+        self.levels = levels
+
+    def __len__(self):
+        return len(self.values)
+
+    def __str__(self):
+        return f"SparseTable: {len(self)} values, {len(self.levels)} levels"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + sum(level.nbytes for level in self.levels)
+
+    def argmin(self, lo, hi):
+        """Position of the smallest value in [lo, hi) (the earliest one on a tie), or None if empty."""
+        lo, hi = max(lo, 0), min(hi, len(self))
+        if lo >= hi:
+            return None
+        k = (hi - lo).bit_length() - 1
+        a, b = self.levels[k][lo], self.levels[k][hi - (1 << k)]
+        return int(b if self.values[b] < self.values[a] else a)
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+def make_etag(*parts):
+    """Strong ETag for a response fully determined by `parts` (JSON-serializable)."""
+    digest = hashlib.sha256(json.dumps(parts, separators=(",", ":")).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value lists `etag` (or is "*")."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in ("*", etag):
+            return True
+    return False
+
+class ResultCache:
+    """Thread-safe LRU of encoded response bodies keyed by ETag, bounded by total bytes.
+
+    The most recently stored body is always kept, even if it alone exceeds the budget.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._bodies = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def __str__(self):
+        return f"ResultCache: {len(self)} results, {self._nbytes / 1e6:.2f} MB"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def get(self, etag):
+        """The body stored under this ETag (marking it recently used), or None."""
+        with self._lock:
+            body = self._bodies.get(etag)
+            if body is not None:
+                self._bodies.move_to_end(etag)
+            return body
+
+    def put(self, etag, body):
+        with self._lock:
+            if etag in self._bodies:
+                self._nbytes -= len(self._bodies.pop(etag))
+            self._bodies[etag] = body
+            self._nbytes += len(body)
+            while len(self._bodies) > 1 and self._nbytes > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self._nbytes -= len(evicted)
@@ -0,0 +1,263 @@
+from bisect import bisect_left, bisect_right, insort
+import numpy as np
+import utils.solve_table as st
+
+DNF_MS = 1 << 62  # sorts after every real time, so DNFs always land in the worst tail
+
+def trim_count(n):
+    """Number of solves dropped from each end of an aoN (1 for ao5/ao12, 5% otherwise)."""
+    return 1 if n in [5, 12] else 5 if n == 100 else int(n * 0.05)
+
+def effective_ms(times_ms, penalties):
+    """Integer solve times in ms with +2 applied and DNFs as DNF_MS, ready for exact window sums."""
+    values = times_ms.astype(np.int64)
+    values[penalties == st.PENALTY_PLUS2] += 2000
+    values[penalties == st.PENALTY_DNF] = DNF_MS
+    return values
+
+class RollingTrimmedAverage:
+    """A trimmed aoN over the last n solves, updated as the window slides.
+
+    The window is kept as a sorted list together with the integer sum of its
+    untrimmed middle. Each solve costs one binary search to insert, one to
+    remove, and an O(1) fix-up of the middle sum from the elements at the trim
+    boundaries, instead of re-sorting all n solves.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.trim = trim_count(n)
+        if 2 * self.trim >= n:
+            raise ValueError("Too few solves to compute a trimmed average.")
+        self.window = []      # values in arrival order, at most n
+        self.sorted = []      # the same values, sorted
+        self.head = 0         # index in `window` of the oldest value still inside
+        self.mid_sum = 0      # sum of sorted[trim:n - trim] once the window is full
+        self.dnfs = 0
+        self.invalid = 0      # solves in the window that make it ineligible
+        self.current = None   # average of the current window, ignoring eligibility
+
+    def __str__(self):
+        return f"RollingTrimmedAverage: ao{self.n}, trimming {self.trim} from each end"
+
+    def __repr__(self):
+        return str(self)
+
+    def _remove(self, value):
+        s, t, k = self.sorted, self.trim, self.n
+        q = bisect_left(s, value)
+        if q < t:
+            self.mid_sum -= s[t]           # the smallest middle value moves down into the low tail
+        elif q >= k - t:
+            self.mid_sum -= s[k - t - 1]   # the largest middle value moves up into the high tail
+        else:
+            self.mid_sum -= value
+        del s[q]
+
+    def _insert(self, value):
+        s, t = self.sorted, self.trim
+        m = len(s)  # n - 1
+        p = bisect_right(s, value)
+        if p < t:
+            self.mid_sum += s[t - 1]       # pushed out of the low tail into the middle
+        elif p > m - t:
+            self.mid_sum += s[m - t]       # pushed out of the high tail into the middle
+        else:
+            self.mid_sum += value
+        s.insert(p, value)
+
+    def push(self, value, valid=True):
+        """Slide the window one solve forward.
+
+        Args:
+            value (int): Solve time in ms from effective_ms().
+            valid (bool): False marks a solve that disqualifies every window containing it.
+
+        Returns:
+            float or None: The trimmed average in seconds (inf when more solves are
+            DNF than are trimmed), or None while fewer than n solves have been seen
+            or the window holds an invalid solve.
+        """
+        n, t = self.n, self.trim
+        self.window.append((value, valid))
+        self.dnfs += value == DNF_MS
+        self.invalid += not valid
+
+        if len(self.window) - self.head < n:
+            self.current = None
+            return None
+        if len(self.window) - self.head == n and not self.sorted:
+            self.sorted = sorted(v for v, _ in self.window[self.head:])
+            self.mid_sum = sum(self.sorted[t:n - t])
+        else:
+            old, old_valid = self.window[self.head]
+            self.head += 1
+            self.dnfs -= old == DNF_MS
+            self.invalid -= not old_valid
+            self._remove(old)
+            self._insert(value)
+            if self.head >= n:  # drop the consumed prefix now and then
+                del self.window[:self.head]
+                self.head = 0
+
+        if self.dnfs > t:
+            self.current = float('inf')
+        else:
+            self.current = self.mid_sum / (n - 2 * t) / 1000
+        return None if self.invalid else self.current
+
+class RollingQuantiles:
+    """Quantiles of the last n solves, kept up to date as the window slides.
+
+    Uses the same bisect-maintained sorted window as RollingTrimmedAverage: a
+    step is a binary search in and out plus an O(1) read of each quantile, but
+    the list insert and delete shift O(n) pointers. That shift is a memmove, so
+    a step stays within a few microseconds up to windows of about 10,000 solves;
+    beyond that an order-statistics tree would be needed. Quantiles interpolate
+    linearly between neighbours like np.quantile.
+    """
+
+    def __init__(self, n, quantiles=(0.1, 0.5, 0.9)):
+        if n < 1:
+            raise ValueError("Window must hold at least one solve.")
+        self.n = n
+        self.quantiles = tuple(quantiles)
+        self.window = []
+        self.head = 0
+        self.sorted = []
+
+    def __str__(self):
+        return f"RollingQuantiles: {self.quantiles} of the last {self.n} solves"
+
+    def __repr__(self):
+        return str(self)
+
+    def _quantile(self, q):
+        s = self.sorted
+        pos = q * (len(s) - 1)
+        lo = int(pos)
+        frac = pos - lo
+        if frac == 0 or s[lo] == DNF_MS:
+            value = s[lo]
+        elif s[lo + 1] == DNF_MS:
+            return float('inf')
+        else:
+            value = s[lo] + (s[lo + 1] - s[lo]) * frac
+        return float('inf') if value == DNF_MS else value / 1000
+
+    def push(self, value):
+        """Slide the window one solve forward.
+
+        Returns:
+            tuple or None: The quantiles in seconds (inf where they fall on DNFs),
+            or None while fewer than n solves have been seen.
+        """
+        self.window.append(value)
+        if len(self.window) - self.head > self.n:
+            del self.sorted[bisect_left(self.sorted, self.window[self.head])]
+            self.head += 1
+            if self.head >= self.n:
+                del self.window[:self.head]
+                self.head = 0
+        insort(self.sorted, value)
+        if len(self.sorted) < self.n:
+            return None
+        return tuple(self._quantile(q) for q in self.quantiles)
+
+def scan_averages(values, ns, eligible=None, bests=None, pb_start=0):
+    """Stream the solves once, keeping every aoN in `ns` up to date together.
+
+    Args:
+        values (ndarray): Solve times in ms from effective_ms().
+        ns (iterable): Window sizes, e.g. (5, 12, 50, 100, 1000).
+        eligible (dict): n -> bool array of solves allowed in a PB window;
+            every solve is eligible for sizes not listed.
+        bests (dict): n -> PB a new average has to beat (inf if not listed).
+        pb_start (int): Rows before this only fill the windows and are not
+            checked for PBs, so a scan can resume after appended solves.
+
+    Returns:
+        dict: n -> (float64 array of the aoN ending at each solve, NaN where there
+        is none; list of (row, average) PBs in order).
+    """
+    values = values.tolist() if hasattr(values, "tolist") else list(values)
+    eligible = eligible or {}
+    bests = dict(bests or {})
+    scans = []
+    for n in ns:
+        ok = eligible.get(n)
+        scans.append((
+            n,
+            RollingTrimmedAverage(n),
+            ok.tolist() if hasattr(ok, "tolist") else ok,
+            np.full(len(values), np.nan),
+            [],
+        ))
+        bests.setdefault(n, float('inf'))
+
+    for i, value in enumerate(values):
+        for n, engine, ok, averages, pbs in scans:
+            avg = engine.push(value, ok[i] if ok is not None else True)
+            if engine.current is not None:
+                averages[i] = engine.current
+            if avg is not None and i >= pb_start and avg < bests[n]:
+                bests[n] = avg
+                pbs.append((i, avg))
+    return {n: (averages, pbs) for n, _, _, averages, pbs in scans}
+
+BATCH_CHUNK_BYTES = 32 * 1024 * 1024  # bound on the window copy np.partition works on
+
+def batch_averages(values, n, valid=None, chunk_bytes=BATCH_CHUNK_BYTES):
+    """Trimmed aoN of every window at once, with sliding_window_view and np.partition.
+
+    Windows are partitioned in chunks of rows so the working copy stays under
+    chunk_bytes however long the session is.
+
+    Returns:
+        ndarray: float64 averages in seconds; entry i covers values[i:i + n].
+        inf when more solves are DNF than are trimmed, NaN when the window holds
+        an invalid solve.
+    """
+    t = trim_count(n)
+    if 2 * t >= n:
+        raise ValueError("Too few solves to compute a trimmed average.")
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) < n:
+        return np.zeros(0, dtype=np.float64)
+
+    windows = np.lib.stride_tricks.sliding_window_view(values, n)
+    mid_sums = np.empty(len(windows), dtype=np.int64)
+    rows = max(1, chunk_bytes // (n * values.itemsize))
+    for start in range(0, len(windows), rows):
+        chunk = windows[start:start + rows]
+        if t:
+            chunk = np.partition(chunk, (t - 1, n - t), axis=1)
+        mid_sums[start:start + rows] = chunk[:, t:n - t].sum(axis=1)
+    averages = mid_sums / (n - 2 * t) / 1000
+
+    def window_counts(mask):
+        counts = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+        return counts[n:] - counts[:-n]
+
+    # DNF_MS sums may wrap around, but only in windows overwritten here
+    averages[window_counts(values == DNF_MS) > t] = np.inf
+    if valid is not None:
+        averages[window_counts(~np.asarray(valid, dtype=bool)) > 0] = np.nan
+    return averages
+
+def batch_means(values, n):
+    """Mean of n (e.g. mo3) of every window at once; inf when the window holds a DNF.
+
+    Returns:
+        ndarray: float64 means in seconds; entry i covers values[i:i + n].
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) < n:
+        return np.zeros(0, dtype=np.float64)
+    dnf = values == DNF_MS
+    clean = np.where(dnf, 0, values)
+    sums = np.concatenate(([0], np.cumsum(clean)))
+    dnfs = np.concatenate(([0], np.cumsum(dnf)))
+    means = (sums[n:] - sums[:-n]) / n / 1000
+    means[(dnfs[n:] - dnfs[:-n]) > 0] = np.inf
+    return means
@@ -0,0 +1,89 @@
+import numpy as np
+
+class SeriesPyramid:
+    """Min, max and mean of a time series over buckets of 2**k consecutive points, for every k.
+
+    Level 0 holds the points themselves and each level halves the one below, so
+    building costs O(n) and memory is about twice the series. A query picks the
+    finest level that fits the requested number of buckets and slices it, in time
+    proportional to the buckets returned. Non-finite values (DNFs) are left out of
+    min, max and mean and counted in `dnf` instead. Queries select points by
+    `search_times` (the timestamps if omitted) and report bucket edges in `timestamps`.
+    """
+
+    def __init__(self, timestamps, values, search_times=None):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        search_times = timestamps if search_times is None else np.asarray(search_times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        # Timestamps can step back (a DST change, a clock fix); search on a non-decreasing copy
+        self.search_keys = np.maximum.accumulate(search_times) if len(search_times) else search_times
+        level = {
+            "start": timestamps,
+            "end": timestamps,
+            "min": np.where(finite, values, np.inf),
+            "max": np.where(finite, values, -np.inf),
+            "sum": np.where(finite, values, 0.0),
+            "count": finite.astype(np.int64),
+            "dnf": (~finite).astype(np.int64),
+        }
+        self.levels = [level]
+        while len(level["start"]) > 1:
+            m = len(level["start"])
+            pairs = np.arange(0, m, 2)
+            level = {
+                "start": level["start"][pairs],
+                "end": level["end"][np.minimum(pairs + 1, m - 1)],
+                "min": np.minimum.reduceat(level["min"], pairs),
+                "max": np.maximum.reduceat(level["max"], pairs),
+                "sum": np.add.reduceat(level["sum"], pairs),
+                "count": np.add.reduceat(level["count"], pairs),
+                "dnf": np.add.reduceat(level["dnf"], pairs),
+            }
+            self.levels.append(level)
+
+    def __len__(self):
+        return len(self.search_keys)
+
+    def __str__(self):
+        return f"SeriesPyramid: {len(self)} points, {len(self.levels)} levels"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def nbytes(self):
+        return self.search_keys.nbytes + sum(array.nbytes for level in self.levels for array in level.values())
+
+    def query(self, t0, t1, resolution):
+        """Buckets of the finest level that covers the points in [t0, t1] with at most
+        `resolution` buckets.
+
+        Returns:
+            dict: "level" and "bucket_size" (points per bucket) of the level used, and
+            per bucket its first and last timestamp ("start", "end"), "min", "max" and
+            "mean" of the finished points (NaN if there are none) and "dnf" count. Edge
+            buckets may reach past [t0, t1].
+        """
+        lo = int(np.searchsorted(self.search_keys, t0, side="left"))
+        hi = int(np.searchsorted(self.search_keys, t1, side="right"))
+        k = 0
+        if hi > lo:
+            while ((hi - 1) >> k) - (lo >> k) + 1 > max(resolution, 1):
+                k += 1
+        level = self.levels[k]
+        a, b = lo >> k, (((hi - 1) >> k) + 1) if hi > lo else lo >> k
+        count = level["count"][a:b]
+        finished = count > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = level["sum"][a:b] / count
+        return {
+            "level": k,
+            "bucket_size": 1 << k,
+            "start": level["start"][a:b],
+            "end": level["end"][a:b],
+            "min": np.where(finished, level["min"][a:b], np.nan),
+            "max": np.where(finished, level["max"][a:b], np.nan),
+            "mean": np.where(finished, mean, np.nan),
+            "dnf": level["dnf"][a:b],
+        }
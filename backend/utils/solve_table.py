@@ -0,0 +1,295 @@
+from array import array
+import numpy as np
+import utils.timezones as tzs
+
+# Penalty codes stored in the int8 penalty column
+PENALTY_NONE = 0
+PENALTY_PLUS2 = 1
+PENALTY_DNF = 2
+
+PERIOD_GAP_MS = 1200 * 1000  # 20 minutes between solves ends a cubing period
+
+def penalty_code(raw_penalty):
+    """Convert a csTimer penalty value (0, 2000 or -1) into a compact penalty code."""
+    if raw_penalty == -1:
+        return PENALTY_DNF
+    if raw_penalty == 2000:
+        return PENALTY_PLUS2
+    return PENALTY_NONE
+
+def raw_penalty(code):
+    """Convert a penalty code back into the value csTimer uses in its exports."""
+    if code == PENALTY_DNF:
+        return -1
+    if code == PENALTY_PLUS2:
+        return 2000
+    return 0
+
+def period_bounds(timestamps, gap_ms=PERIOD_GAP_MS, session_ids=None):
+    """Split a timestamp column into cubing periods with one diff over the whole array.
+
+    Args:
+        timestamps (ndarray): Epoch-ms timestamps in solve order.
+        gap_ms (int): A longer gap between two solves ends a period.
+        session_ids (ndarray): Optional session column; a period also ends where it changes.
+
+    Returns:
+        tuple: (starts, stops) int64 arrays; period i is rows [starts[i], stops[i]).
+        Every row belongs to exactly one period, including the last one.
+    """
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    ends = np.diff(timestamps) > gap_ms
+    if session_ids is not None:
+        ends |= session_ids[1:] != session_ids[:-1]
+    breaks = np.flatnonzero(ends) + 1
+    starts = np.concatenate(([0], breaks)).astype(np.int64)
+    stops = np.concatenate((breaks, [len(timestamps)])).astype(np.int64)
+    return starts, stops
+
+
+class PackedStrings:
+    """A read-only list of strings stored as one UTF-8 buffer plus an offsets array.
+
+    Scrambles and comments are only needed for display, so keeping them packed
+    avoids allocating one Python str per solve.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data          # uint8 array holding every string back to back
+        self.offsets = offsets    # int64 array of len(strings) + 1 boundaries
+
+    @classmethod
+    def from_list(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("PackedStrings only supports contiguous slices.")
+            return PackedStrings(self.data, self.offsets[start:max(start, stop) + 1])
+        if index < 0:
+            index += len(self)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes
+
+    @classmethod
+    def concatenate(cls, parts):
+        data = np.concatenate([part.data[part.offsets[0]:part.offsets[-1]] for part in parts])
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for part in parts:
+            offsets.append(part.offsets[1:] - part.offsets[0] + base)
+            base += int(part.offsets[-1] - part.offsets[0])
+        return cls(data, np.concatenate(offsets))
+
+
+class SolveTable:
+    """Struct-of-arrays storage for every solve in an export.
+
+    Columns:
+        timestamps (int64): epoch milliseconds (UTC).
+        times_ms (int32): raw timer value in milliseconds, without the +2.
+        penalties (int8): PENALTY_NONE, PENALTY_PLUS2 or PENALTY_DNF.
+        session_ids (int32): csTimer session number of the solve.
+        event_ids (int16): index into `events`.
+    Scrambles and comments are kept in PackedStrings side arrays.
+    """
+
+    def __init__(self, timestamps, times_ms, penalties, session_ids, event_ids,
+                 scrambles, comments, events, timezone_str='UTC'):
+        self.timestamps = timestamps
+        self.times_ms = times_ms
+        self.penalties = penalties
+        self.session_ids = session_ids
+        self.event_ids = event_ids
+        self.scrambles = scrambles
+        self.comments = comments
+        self.events = events
+        self.timezone_str = timezone_str
+        self._times = None
+        self._local_timestamps = None
+        self._local_columns = {}
+        self._period_bounds = {}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __str__(self):
+        return f"SolveTable: {len(self)} solves, {len(self.events)} events, {self.nbytes / 1e6:.2f} MB"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def times(self):
+        """Solve times in seconds as float64, with +2 applied and DNFs as infinity."""
+        if self._times is None:
+            times = self.times_ms.astype(np.float64) / 1000
+            times[self.penalties == PENALTY_PLUS2] += 2
+            times[self.penalties == PENALTY_DNF] = np.inf
+            self._times = times
+        return self._times
+
+    @property
+    def local_timestamps(self):
+        """Timestamps shifted into local wall-clock epoch milliseconds for `timezone_str`."""
+        if self._local_timestamps is None:
+            self._local_timestamps = tzs.local_timestamps(self.timestamps, self.timezone_str)
+        return self._local_timestamps
+
+    def _local_column(self, name, convert):
+        if name not in self._local_columns:
+            self._local_columns[name] = convert(self.local_timestamps)
+        return self._local_columns[name]
+
+    @property
+    def local_days(self):
+        """Local calendar day of each solve (int32 days since 1970-01-01)."""
+        return self._local_column('days', tzs.local_days)
+
+    @property
+    def local_hours(self):
+        """Local hour of day of each solve (int8, 0-23)."""
+        return self._local_column('hours', tzs.local_hours)
+
+    @property
+    def local_weekdays(self):
+        """Local weekday of each solve (int8, 0 = Monday)."""
+        return self._local_column('weekdays', tzs.local_weekdays)
+
+    @property
+    def local_months(self):
+        """Local calendar month of each solve (int32 months since 1970-01)."""
+        return self._local_column('months', tzs.local_months)
+
+    def period_bounds(self, gap_ms=PERIOD_GAP_MS):
+        """Cubing periods of every session in the table, segmented once per gap and then reused."""
+        if gap_ms not in self._period_bounds:
+            self._period_bounds[gap_ms] = period_bounds(self.timestamps, gap_ms, self.session_ids)
+        return self._period_bounds[gap_ms]
+
+    def set_session_events(self, session_events):
+        """Fill the event columns from a {session_id: event_name} mapping."""
+        self.events = list(dict.fromkeys(session_events.values()))
+        event_index = {event: i for i, event in enumerate(self.events)}
+        self.event_ids = np.full(len(self), -1, dtype=np.int16)
+        if not session_events or not len(self):
+            return
+        ids = np.array(sorted(session_events), dtype=np.int32)
+        ids_events = np.array([event_index[session_events[i]] for i in ids.tolist()], dtype=np.int16)
+        pos = np.minimum(np.searchsorted(ids, self.session_ids), len(ids) - 1)
+        known = ids[pos] == self.session_ids
+        self.event_ids[known] = ids_events[pos[known]]
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in (
+            self.timestamps, self.times_ms, self.penalties, self.session_ids,
+            self.event_ids, self.scrambles, self.comments,
+        ))
+
+    @property
+    def derived_nbytes(self):
+        """Bytes of the columns computed on first use: times, local time columns and period bounds."""
+        arrays = [self._times, self._local_timestamps, *list(self._local_columns.values())]
+        arrays += [bounds for pair in list(self._period_bounds.values()) for bounds in pair]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+
+class PackedStringsBuilder:
+    """Appends strings straight into a growing UTF-8 buffer."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('q', [0])
+
+    def append(self, string):
+        self.data += string.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def build(self):
+        return PackedStrings(
+            np.frombuffer(self.data, dtype=np.uint8),
+            np.frombuffer(self.offsets, dtype=np.int64),
+        )
+
+
+def concat_tables(tables, timezone_str='UTC'):
+    """Stack several SolveTables (e.g. parsed by different workers) into one, in order."""
+    return SolveTable(
+        timestamps=np.concatenate([t.timestamps for t in tables]),
+        times_ms=np.concatenate([t.times_ms for t in tables]),
+        penalties=np.concatenate([t.penalties for t in tables]),
+        session_ids=np.concatenate([t.session_ids for t in tables]),
+        event_ids=np.concatenate([t.event_ids for t in tables]),
+        scrambles=PackedStrings.concatenate([t.scrambles for t in tables]),
+        comments=PackedStrings.concatenate([t.comments for t in tables]),
+        events=[],
+        timezone_str=timezone_str,
+    )
+
+
+class SolveTableBuilder:
+    """Accumulates solves into compact typed arrays and freezes them into a SolveTable.
+
+    Solves of one session must be added contiguously; `session_ranges` records the
+    [start, stop) rows of every session seen so far. Event ids are left at -1 until
+    SolveTable.set_session_events is called, since csTimer stores session metadata
+    after the solves.
+    """
+
+    def __init__(self):
+        self.timestamps = array('q')
+        self.times_ms = array('i')
+        self.penalties = array('b')
+        self.session_ids = array('i')
+        self.scrambles = PackedStringsBuilder()
+        self.comments = PackedStringsBuilder()
+        self.session_ranges = {}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def add_raw_solve(self, session_id, raw_solve):
+        """Append one csTimer solve entry: [[penalty, time_ms], scramble, comment, unix_time]."""
+        if session_id not in self.session_ranges:
+            self.session_ranges[session_id] = [len(self), len(self)]
+        self.session_ranges[session_id][1] += 1
+        self.penalties.append(penalty_code(raw_solve[0][0]))
+        self.times_ms.append(raw_solve[0][1])
+        self.scrambles.append(raw_solve[1])
+        self.comments.append(raw_solve[2])
+        self.timestamps.append(raw_solve[3] * 1000)
+        self.session_ids.append(session_id)
+
+    def build(self, timezone_str='UTC'):
+        # The typed arrays are wrapped without copying, so the builder must not be reused
+        session_ids = np.frombuffer(self.session_ids, dtype=np.int32)
+        return SolveTable(
+            timestamps=np.frombuffer(self.timestamps, dtype=np.int64),
+            times_ms=np.frombuffer(self.times_ms, dtype=np.int32),
+            penalties=np.frombuffer(self.penalties, dtype=np.int8),
+            session_ids=session_ids,
+            event_ids=np.full(len(session_ids), -1, dtype=np.int16),
+            scrambles=self.scrambles.build(),
+            comments=self.comments.build(),
+            events=[],
+            timezone_str=timezone_str,
+        )
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import pytz
+
+HOUR_MS = 3600 * 1000
+DAY_MS = 24 * HOUR_MS
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday (Monday = 0)
+
+class OffsetTable:
+    """UTC offsets of a timezone over a span of time.
+
+    `transitions[i]` is the epoch-ms instant from which `offsets[i]` applies, so a
+    whole timestamp array maps to local time with one searchsorted plus an add.
+    """
+
+    def __init__(self, timezone_str, transitions, offsets):
+        self.timezone_str = timezone_str
+        self.transitions = transitions
+        self.offsets = offsets
+
+    def __str__(self):
+        return f"OffsetTable: {self.timezone_str}, {len(self.transitions) - 1} transitions"
+
+    def __repr__(self):
+        return str(self)
+
+    def to_local(self, timestamps):
+        idx = np.searchsorted(self.transitions, timestamps, side='right') - 1
+        return timestamps + self.offsets[np.maximum(idx, 0)]
+
+def _utc_offset_ms(tz, epoch_ms):
+    offset = datetime.fromtimestamp(epoch_ms / 1000, tz).utcoffset()
+    return int(offset.total_seconds() * 1000)
+
+def _find_transition(tz, low_ms, high_ms, low_offset):
+    """Binary search (to the second) for the instant the offset stops being low_offset."""
+    while high_ms - low_ms > 1000:
+        mid_ms = (low_ms + high_ms) // 2000 * 1000
+        if _utc_offset_ms(tz, mid_ms) == low_offset:
+            low_ms = mid_ms
+        else:
+            high_ms = mid_ms
+    return high_ms
+
+@lru_cache(maxsize=64)
+def offset_table(timezone_str, first_day, last_day):
+    """Resolve the UTC-offset transitions of a timezone between two epoch days (inclusive).
+
+    Offsets are sampled once per day and every change is pinned down by binary
+    search, so the cost depends on the span of the export, not on its solve count.
+    """
+    tz = pytz.timezone(timezone_str)
+    transitions = [first_day * DAY_MS]
+    offsets = [_utc_offset_ms(tz, first_day * DAY_MS)]
+    for day in range(first_day + 1, last_day + 2):
+        day_offset = _utc_offset_ms(tz, day * DAY_MS)
+        if day_offset != offsets[-1]:
+            transitions.append(_find_transition(tz, (day - 1) * DAY_MS, day * DAY_MS, offsets[-1]))
+            offsets.append(day_offset)
+    return OffsetTable(timezone_str, np.array(transitions, dtype=np.int64), np.array(offsets, dtype=np.int64))
+
+def local_timestamps(timestamps, timezone_str='UTC'):
+    """Shift an array of epoch-ms timestamps into local wall-clock milliseconds."""
+    if len(timestamps) == 0:
+        return timestamps.copy()
+    first_day = int(timestamps.min()) // DAY_MS
+    last_day = int(timestamps.max()) // DAY_MS
+    return offset_table(timezone_str, first_day, last_day).to_local(timestamps)
+
+def local_days(local_ms):
+    """Local calendar day of each timestamp, as days since 1970-01-01."""
+    return (local_ms // DAY_MS).astype(np.int32)
+
+def local_hours(local_ms):
+    """Local hour of day (0-23) of each timestamp."""
+    return (local_ms // HOUR_MS % 24).astype(np.int8)
+
+def local_weekdays(local_ms):
+    """Local weekday (0 = Monday) of each timestamp."""
+    return ((local_ms // DAY_MS + EPOCH_WEEKDAY) % 7).astype(np.int8)
+
+def local_months(local_ms):
+    """Local calendar month of each timestamp, as months since 1970-01."""
+    return local_ms.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int32)
+
+def local_datetime(local_ms):
+    """Naive datetime for a local wall-clock timestamp."""
+    return datetime(1970, 1, 1) + timedelta(milliseconds=int(local_ms))
+
+def format_local(local_ms):
+    """Render a local timestamp as 'YYYY-MM-DD HH:MM:SS'."""
+    return local_datetime(local_ms).strftime('%Y-%m-%d %H:%M:%S')
+
+def format_local_date(local_ms):
+    """Render a local timestamp as 'YYYY-MM-DD'."""
+    return local_datetime(local_ms).strftime('%Y-%m-%d')
+
+def format_day(day):
+    """Render a day number from local_days() as 'YYYY-MM-DD'."""
+    return format_local_date(int(day) * DAY_MS)
+
+def format_month(month):
+    """Render a month number from local_months() as 'YYYY-MM'."""
+    return str(np.datetime64(int(month), 'M'))
+
+def format_local_array(local_ms):
+    """Render an array of local timestamps as 'YYYY-MM-DD HH:MM:SS' strings in one vectorized call."""
+    seconds = (np.asarray(local_ms, dtype=np.int64) // 1000).astype('datetime64[s]')
+    if not len(seconds):  # np.char.replace cannot size its output from an empty array
+        return np.zeros(0, dtype='<U19')
+    return np.char.replace(np.datetime_as_string(seconds, unit='s'), 'T', ' ')
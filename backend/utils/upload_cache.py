@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import utils.preprocess_solves as pf
+import utils.solve_table as st
+
+CACHE_DIR = os.environ.get("UPLOAD_CACHE_DIR", "cache")
+CACHE_MAX_BYTES = int(os.environ.get("UPLOAD_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+SNAPSHOT_VERSION = 1
+
+_COLUMNS = ("timestamps", "times_ms", "penalties", "session_ids", "event_ids")
+_STRING_COLUMNS = ("scrambles", "comments")
+
+def hash_file(filepath):
+    """SHA-256 of a file's bytes, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _snapshot_dir(content_hash, cache_dir):
+    return os.path.join(cache_dir, content_hash)
+
+def save_snapshot(sessions, directory):
+    """Write the solve table behind `sessions` as .npy columns plus a small JSON index."""
+    table = sessions[0].table
+    os.makedirs(directory, exist_ok=True)
+    for name in _COLUMNS:
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(table, name))
+    for name in _STRING_COLUMNS:
+        packed = getattr(table, name)
+        np.save(os.path.join(directory, f"{name}_data.npy"), packed.data)
+        np.save(os.path.join(directory, f"{name}_offsets.npy"), packed.offsets)
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "events": table.events,
+        "sessions": [
+            [session.name, session.id, session.scramble_event, session.start, session.stop, session.multiple_events]
+            for session in sessions
+        ],
+    }
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+def load_snapshot(directory, timezone_str='UTC'):
+    """Open a snapshot with memory-mapped columns. Returns None if it is missing or outdated."""
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != SNAPSHOT_VERSION:
+        return None
+
+    def column(name):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+    table = st.SolveTable(
+        **{name: column(name) for name in _COLUMNS},
+        **{name: st.PackedStrings(column(f"{name}_data"), column(f"{name}_offsets")) for name in _STRING_COLUMNS},
+        events=meta["events"],
+        timezone_str=timezone_str,
+    )
+    return [
+        pf.Session(name, session_id, scramble_event, table, start, stop, multiple_events)
+        for name, session_id, scramble_event, start, stop, multiple_events in meta["sessions"]
+    ]
+
+def _entry_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """Delete least recently used snapshots until the cache fits in max_bytes."""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir() and not entry.name.startswith("."):
+            meta_path = os.path.join(entry.path, "meta.json")
+            last_used = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+            entries.append((last_used, _entry_size(entry.path), entry.path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+def cached_load_all_sessions(filepath, content_hash, timezone_str='UTC', workers=1, cache_dir=CACHE_DIR):
+    """load_all_sessions, but reuse the parsed table of an identical earlier upload.
+
+    Snapshots are keyed by the SHA-256 of the file and hold UTC columns only, so
+    re-uploading the same export with another timezone is still a cache hit.
+    """
+    directory = _snapshot_dir(content_hash, cache_dir)
+    try:
+        sessions = load_snapshot(directory, timezone_str)
+        if sessions is not None:
+            os.utime(os.path.join(directory, "meta.json"))  # mark as recently used
+            return sessions
+    except (OSError, ValueError):
+        pass  # evicted (or replaced) by another upload while being opened: parse the file instead
+
+    sessions = pf.load_all_sessions(filepath, timezone_str=timezone_str, workers=workers)
+    if not sessions:
+        return sessions
+
+    # Write into a temporary directory and rename it, so readers never see half a snapshot
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=cache_dir, prefix=".staging-")
+    try:
+        save_snapshot(sessions, staging)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+    evict(cache_dir)
+    return sessions
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+import secrets
+import threading
+import time
+
+class UploadJob:
+    """Progress and partial results of an upload analysed in the background.
+
+    The worker running the upload moves each stage from "pending" through
+    "running" to "done" and publishes stats as they are computed, while request
+    handlers read snapshots; `version` grows on every change so watchers know
+    when there is something new to report.
+    """
+
+    def __init__(self, stages):
+        self.id = secrets.token_urlsafe(16)
+        self.stages = OrderedDict(
+            (name, {"status": "pending", "done": 0, "total": None, "seconds": None}) for name in stages
+        )
+        self.results = {}
+        self.dataset_id = None
+        self.error = None
+        self.version = 0
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f"UploadJob: {self.id}, {self.status}, {len(self.results)} stats ready"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def status(self):
+        """"queued", "running", "done" or "failed"."""
+        if self.error is not None:
+            return "failed"
+        if all(stage["status"] == "done" for stage in self.stages.values()):
+            return "done"
+        if any(stage["status"] != "pending" for stage in self.stages.values()):
+            return "running"
+        return "queued"
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def start(self, stage):
+        with self._lock:
+            self._started[stage] = time.perf_counter()
+            self.stages[stage]["status"] = "running"
+            self.version += 1
+
+    def advance(self, stage, done, total):
+        """Record that `done` of `total` steps of a stage are complete, finishing it at the last one."""
+        if stage not in self._started:
+            self.start(stage)
+        with self._lock:
+            self.stages[stage].update(done=done, total=total)
+            self.version += 1
+        if done >= total:
+            self.finish(stage)
+
+    def finish(self, stage, results=None):
+        """Mark a stage done and publish the stats it produced."""
+        with self._lock:
+            entry = self.stages[stage]
+            if entry["total"] is None:
+                entry["total"] = 1  # a stage done in one step
+            entry.update(status="done", done=entry["total"])
+            entry["seconds"] = round(time.perf_counter() - self._started.get(stage, time.perf_counter()), 3)
+            if results:
+                self.results.update(results)
+            self.version += 1
+
+    def fail(self, message):
+        with self._lock:
+            self.error = message
+            self.version += 1
+
+    def snapshot(self):
+        """JSON-ready view of the job, listing the stats ready so far."""
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "dataset_id": self.dataset_id,
+                "error": self.error,
+                "stages": [{"name": name, **stage} for name, stage in self.stages.items()],
+                "ready": list(self.results),
+            }
+
+class JobStore:
+    """Thread-safe LRU of the most recent UploadJobs."""
+
+    def __init__(self, max_jobs=64):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __str__(self):
+        return f"JobStore: {len(self)} jobs"
+
+    def __repr__(self):
+        return str(self)
+
+    def put(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return job.id
+
+    def get(self, job_id):
+        """The job with this id, or None if unknown or evicted."""
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,121 @@
+import json
+import struct
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack responses are only offered when it is installed
+    msgpack = None
+
+# Response encodings, chosen from the Accept header. JSON is the default and keeps
+# the original shapes; the other three are columnar: every time series is sent as
+# parallel numpy arrays (epoch-ms timestamps and seconds) instead of a dict keyed
+# by date strings.
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.cstimer.columnar+json"
+MSGPACK = "application/x-msgpack"
+RAW = "application/octet-stream"
+
+COLUMNAR = (COLUMNAR_JSON, MSGPACK, RAW)
+_ALIASES = {"application/msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+def available():
+    """Encodings this server can produce, in order of preference for wildcards."""
+    return (JSON, COLUMNAR_JSON, RAW) + ((MSGPACK,) if msgpack is not None else ())
+
+def negotiate(accept):
+    """The encoding to answer an Accept header with, or None if none is acceptable.
+
+    A missing header or a wildcard gets JSON; among explicitly listed encodings the
+    highest q-value wins, ties going to the earliest.
+    """
+    if not accept:
+        return JSON
+    offered = available()
+    ranked = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        media_type = _ALIASES.get(media_type.lower(), media_type.lower())
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q <= 0:
+            continue
+        if media_type in ("*/*", "application/*"):
+            media_type = JSON
+        if media_type in offered:
+            ranked.append((-q, position, media_type))
+    return min(ranked)[2] if ranked else None
+
+def _wire_array(array):
+    """Little-endian copy of an array as sent in binary encodings: values as float32,
+    timestamps (and other integers) as float64, which JavaScript reads exactly."""
+    dtype = "<f4" if array.dtype.kind == "f" else "<f8"
+    return np.ascontiguousarray(array, dtype=dtype), dtype
+
+def _json_array(array):
+    if not isinstance(array, np.ndarray):
+        raise TypeError(f"Object of type {type(array).__name__} is not JSON serializable")
+    if array.dtype.kind != "f":
+        return array.tolist()
+    # Tenth-of-a-millisecond precision, with null for NaN and inf (DNF) as in the JSON encoding
+    rounded = np.round(array, 4).astype(object)
+    rounded[~np.isfinite(array)] = None
+    return rounded.tolist()
+
+def _dumps(payload):
+    # Same output as FastAPI's JSONResponse, with numpy arrays as lists
+    return json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_json_array
+    ).encode("utf-8")
+
+def _without_arrays(payload, replace):
+    """Copy of a payload of dicts, lists and tuples with every numpy array passed through `replace`."""
+    if isinstance(payload, np.ndarray):
+        return replace(payload)
+    if isinstance(payload, dict):
+        return {key: _without_arrays(value, replace) for key, value in payload.items()}
+    if isinstance(payload, (list, tuple)):
+        return [_without_arrays(value, replace) for value in payload]
+    return payload
+
+def encode_raw(payload):
+    """Encode a columnar payload as one little-endian buffer.
+
+    Layout: a uint32 header length, a UTF-8 JSON header padded with spaces to a
+    multiple of 8 bytes, then the array data. In the header every array is replaced
+    by {"dtype", "offset", "length"}, with offset in bytes from the end of the
+    header, so each one can be viewed as a Float32Array or Float64Array in place.
+    """
+    buffers = []
+    offset = 0
+
+    def replace(array):
+        nonlocal offset
+        data, dtype = _wire_array(array)
+        entry = {"dtype": dtype, "offset": offset, "length": len(data)}
+        buffers.append(data.tobytes())
+        offset += data.nbytes
+        offset += -offset % 8
+        buffers.append(b"\0" * (-data.nbytes % 8))
+        return entry
+
+    header = _dumps(_without_arrays(payload, replace))
+    header += b" " * (-(len(header) + 4) % 8)
+    return struct.pack("<I", len(header)) + header + b"".join(buffers)
+
+def encode(payload, media_type):
+    """Encode a response payload. Both JSON encodings send numpy arrays as lists."""
+    if media_type == RAW:
+        return encode_raw(payload)
+    if media_type == MSGPACK:
+        def replace(array):
+            data, dtype = _wire_array(array)
+            return {"dtype": dtype, "length": len(data), "data": data.tobytes()}
+        return msgpack.packb(_without_arrays(payload, replace), use_bin_type=True)
+    return _dumps(payload)
@@ -7,6 +7,57 @@ import SolveLevelChart from "./Components/SolveLevelChart";
 import SelectSession from "./Components/SelectSession";
 import { FaGithub } from "react-icons/fa";
 
+// Follows a background upload job, passing each stat to onStats as soon as the
+// server reports it ready; resolves once every stat has been received. The server
+// closes the stream after the done/failed snapshot, so that snapshot closes it first
+// and the error fired by the close is ignored
+function followUploadJob(jobId, onStats) {
+  const api = process.env.REACT_APP_API_URL;
+  const fetched = new Set();
+  const fetches = [];
+  let finished = false;
+  return new Promise((resolve, reject) => {
+    const events = new EventSource(`${api}/upload-jobs/${jobId}/events`);
+    const fail = (err) => {
+      finished = true;
+      events.close();
+      reject(err);
+    };
+    events.addEventListener("progress", (e) => {
+      if (finished) return;
+      const job = JSON.parse(e.data);
+      if (job.status === "failed") {
+        fail(new Error(job.error || "Upload failed"));
+        return;
+      }
+      if (job.status === "done") {
+        finished = true;
+        events.close();
+      }
+      if (job.dataset_id) onStats({ dataset_id: job.dataset_id });
+      const pending = job.ready.filter((key) => !fetched.has(key));
+      pending.forEach((key) => fetched.add(key));
+      fetches.push(
+        ...pending.map(async (key) => {
+          const res = await fetch(`${api}/upload-jobs/${jobId}/stats/${key}`);
+          if (!res.ok) throw new Error("Failed to fetch stats");
+          onStats(await res.json());
+        })
+      );
+      Promise.all(fetches).then(
+        () => {
+          if (job.status === "done") resolve();
+        },
+        fail
+      );
+    });
+    events.onerror = () => {
+      if (finished) return;
+      fail(new Error("Lost connection to the server"));
+    };
+  });
+}
+
 export default function App() {
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
@@ -28,10 +79,14 @@ export default function App() {
       "timezone",
       Intl.DateTimeFormat().resolvedOptions().timeZone
     );
+    // Lets the server reuse the previous upload's stats when the new export only adds solves
+    if (globalStats.dataset_id) {
+      formData.append("previous_dataset_id", globalStats.dataset_id);
+    }
 
     try {
       const res = await fetch(
-        `${process.env.REACT_APP_API_URL}/upload-solves/`,
+        `${process.env.REACT_APP_API_URL}/upload-jobs/`,
         {
           method: "POST",
           body: formData,
@@ -39,16 +94,19 @@ export default function App() {
       );
 
       if (!res.ok) throw new Error("Upload failed");
-      const data = await res.json();
+      const job = await res.json();
 
-      setGlobalStats(data);
+      setGlobalStats({});
+      await followUploadJob(job.job_id, (stats) =>
+        setGlobalStats((prev) => ({ ...prev, ...stats }))
+      );
       alert("File uploaded successfully!");
     } catch (err) {
       alert(err.message);
     } finally {
       setLoading(false);
     }
-  }, [file]);
+  }, [file, globalStats.dataset_id]);
 
   const handleSessionSelect = (sessionData) => setSessionStats(sessionData);
 
@@ -72,6 +130,16 @@ export default function App() {
       Component: ScatterPlot,
       propKey: "dataDict",
     },
+    pbs_per_month_stats: {
+      title: "PB Count by Month",
+      Component: BarGraph,
+      propKey: "stats",
+    },
+    pbs_per_event_stats: {
+      title: "PB Count by Event",
+      Component: BarGraph,
+      propKey: "stats",
+    },
     days_dict_stats: {
       title: "Activity by Day",
       Component: BarGraph,
@@ -174,6 +242,7 @@ export default function App() {
 
             <Section title="Session/Event Specific Stats">
               <SelectSession
+                dataset_id={globalStats.dataset_id}
                 session_names={globalStats.session_names}
                 onSessionSelect={handleSessionSelect}
               />
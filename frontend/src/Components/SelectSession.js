@@ -1,6 +1,9 @@
 import React, { useState } from "react";
 
-function SelectSession({ session_names, onSessionSelect }) {
+// Long sessions are downsampled by the server to about as many points as a chart can show
+const MAX_CHART_POINTS = 2000;
+
+function SelectSession({ dataset_id, session_names, onSessionSelect }) {
   const [loading, setLoading] = useState(false);
 
   async function handleSubmit(event) {
@@ -17,15 +20,15 @@ function SelectSession({ session_names, onSessionSelect }) {
 
     setLoading(true);
     try {
+      // A GET lets the browser revalidate its cached copy via the ETag, so
+      // returning to a session is answered with a 304
+      const params = new URLSearchParams({
+        dataset_id: dataset_id,
+        session_index: selectedIndex,
+        max_points: MAX_CHART_POINTS,
+      });
       const response = await fetch(
-        `${process.env.REACT_APP_API_URL}/session-stats/`,
-        {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({ session_index: selectedIndex }),
-        }
+        `${process.env.REACT_APP_API_URL}/session-stats/?${params}`
       );
 
       if (!response.ok) {